@@ -0,0 +1,298 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from logging import getLogger
+
+from device_control.drivers.conex import (
+    CONEX_STATES,
+    ConexAGAPButOnlyOneAxis,
+    Homing,
+    Moving,
+    NotReferenced,
+    Ready,
+)
+from device_control.scheduler import Priority
+
+__all__ = ["AsyncCONEXDevice", "AsyncMotionDevice", "AsyncTransport", "move_all"]
+
+# a timeout from `asyncio.wait_for` is only the builtin `TimeoutError` from Python 3.11
+INTERRUPTIONS = (TimeoutError, asyncio.TimeoutError, asyncio.CancelledError)
+
+
+def _in_new_thread(func):
+    # stops must not queue behind the moves they interrupt
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(func())
+        except BaseException as exc:
+            future.set_exception(exc)
+
+    threading.Thread(target=run, name="aio-stop", daemon=True).start()
+    return asyncio.wrap_future(future)
+
+
+class AsyncTransport:
+    """
+    Asyncio access to a `Transport`, shared with its synchronous users.
+
+    Transactions are queued on the port's `PortScheduler` with the others, and reads wait
+    for data by polling the transport every `poll` s, so the event loop never blocks on
+    the device. Reads give up after the transport's `timeout` and return what has
+    arrived, like the transport itself.
+    """
+
+    def __init__(self, transport, poll=0.005):
+        self.transport = transport
+        self.poll = poll  # s
+        self._buffer = bytearray()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.transport!r})"
+
+    @asynccontextmanager
+    async def transaction(self, owner=None, priority=Priority.STATUS):
+        """Hold the port for one exchange, see `PortScheduler.atransaction`"""
+        transport = self.transport
+        async with transport.scheduler.atransaction(owner, priority, poll=self.poll):
+            try:
+                transport.open()
+                yield self
+            except transport.ERRORS:
+                transport.errors += 1
+                transport.close()
+                raise
+
+    def write(self, data) -> int:
+        return self.transport.write(data)
+
+    def _receive(self):
+        size = self.transport.in_waiting
+        if size > 0:
+            self._buffer += self.transport.read(size)
+        return size
+
+    def _take(self, size):
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    async def read_until(self, expected=b"\n", timeout=None) -> bytes:
+        if timeout is None:
+            timeout = self.transport.timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            idx = self._buffer.find(expected)
+            if idx >= 0:
+                return self._take(idx + len(expected))
+            if self._receive() == 0:
+                if deadline is not None and time.monotonic() >= deadline:
+                    return self._take(len(self._buffer))
+                await asyncio.sleep(self.poll)
+
+    async def readline(self, timeout=None) -> bytes:
+        return await self.read_until(b"\n", timeout=timeout)
+
+
+class AsyncMotionDevice:
+    """
+    Convenience asyncio wrapper around a `MotionDevice`, for scripts which coordinate
+    stages from an event loop.
+
+    This is not native asynchronous I/O: the drivers stay synchronous, and each call
+    runs the blocking driver method with `asyncio.to_thread`, so a call in progress
+    still occupies a thread of the loop's default executor. What it adds is the asyncio
+    control flow: every method is a coroutine bounded by `timeout`, and if a move or
+    home is cancelled or times out, the stage is sent a stop (from its own thread),
+    which takes priority on its port over the ongoing move polling. The thread running
+    the interrupted call only returns once the driver does. Drivers with a native
+    asyncio counterpart built on `AsyncTransport` (`AsyncCONEXDevice`) don't have
+    this limitation.
+
+    Examples
+    --------
+    >>> bs = AsyncCONEXDevice(VAMPIRESBeamsplitter.connect(local=True))
+    >>> diff = AsyncCONEXDevice(VAMPIRESDiffWheel.connect(local=True))
+    >>> await move_all({bs: "PBS", diff: "Open / Open"}, timeout=30)
+    """
+
+    def __init__(self, device, stop_on_cancel=True):
+        self.device = device
+        self.stop_on_cancel = stop_on_cancel
+        self.logger = getLogger(f"Async{device.__class__.__name__}")
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.device!r})"
+
+    async def call(self, name, *args, timeout=None, **kwargs):
+        """Run any method of the wrapped device"""
+        func = functools.partial(getattr(self.device, name), *args, **kwargs)
+        return await asyncio.wait_for(asyncio.to_thread(func), timeout)
+
+    async def _motion(self, name, *args, timeout=None, **kwargs):
+        return await self._stopping(name, self.call(name, *args, timeout=timeout, **kwargs))
+
+    async def _stopping(self, name, coro):
+        try:
+            return await coro
+        except INTERRUPTIONS:
+            if self.stop_on_cancel:
+                self.logger.warning(f"{name} interrupted, stopping stage")
+                await asyncio.shield(self.stop())
+            raise
+
+    async def get_position(self, timeout=None):
+        return await self.call("get_position", timeout=timeout)
+
+    async def get_status(self, timeout=None):
+        return await self.call("get_status", timeout=timeout)
+
+    async def get_configuration(self, timeout=None):
+        return await self.call("get_configuration", timeout=timeout)
+
+    async def home(self, timeout=None):
+        return await self._motion("home", timeout=timeout)
+
+    async def move_absolute(self, value, timeout=None, **kwargs):
+        return await self._motion("move_absolute", value, timeout=timeout, **kwargs)
+
+    async def move_relative(self, value, timeout=None):
+        return await self._motion("move_relative", value, timeout=timeout)
+
+    async def move_configuration(self, idx_or_name, timeout=None, **kwargs):
+        return await self._motion("move_configuration", idx_or_name, timeout=timeout, **kwargs)
+
+    async def stop(self):
+        return await _in_new_thread(self.device.stop)
+
+
+class AsyncCONEXDevice(AsyncMotionDevice):
+    """
+    Native asyncio driver for a `CONEXDevice`.
+
+    Positions, moves, homing and stops are exchanged with the controller through an
+    `AsyncTransport` on the device's port, so waiting for a move takes no thread. The
+    other methods of the device (and its configurations, offset and key updates) are
+    still reached through `call` and the wrapped device.
+
+    Examples
+    --------
+    >>> bs = AsyncCONEXDevice(VAMPIRESBeamsplitter.connect(local=True))
+    >>> await bs.move_configuration("PBS", timeout=30)
+    """
+
+    def __init__(self, device, stop_on_cancel=True, poll=0.005):
+        if isinstance(device, ConexAGAPButOnlyOneAxis):
+            msg = "AGAP controllers are not supported, wrap them with AsyncMotionDevice"
+            raise TypeError(msg)
+        super().__init__(device, stop_on_cancel=stop_on_cancel)
+        self.transport = AsyncTransport(device.serial, poll=poll)
+
+    async def _exchange(self, command, priority):
+        device = self.device
+        cmd = f"{device.device_address}{command}\r\n"
+        self.logger.debug(f"sending command: {cmd[:-2]}")
+        async with self.transport.transaction(device.device_address, priority) as transport:
+            transport.write(cmd.encode())
+            return await transport.read_until(b"\r\n")
+
+    async def send_command(self, command: str, priority=Priority.STATUS):
+        await self._exchange(command, priority)
+
+    async def ask_command(self, command: str, priority=Priority.STATUS) -> str:
+        return self.device.parse_reply(command, await self._exchange(command, priority))
+
+    async def get_state(self, priority=Priority.STATUS):
+        return CONEX_STATES[await self.ask_command("MM?", priority)]
+
+    async def _get_position(self, priority=Priority.STATUS):
+        position = float(await self.ask_command("TP", priority)) + self.device.offset
+        self.device._update_keys(position)
+        return position
+
+    async def get_position(self, timeout=None):
+        return await asyncio.wait_for(self._get_position(), timeout)
+
+    async def get_configuration(self, timeout=None):
+        position = await self.get_position(timeout=timeout)
+        return self.device.get_configuration(position)
+
+    async def get_status(self, timeout=None):
+        position = await self.get_position(timeout=timeout)
+        idx, name = self.device.get_configuration(position)
+        return position, self.device.format_str.format(idx, name, position)
+
+    async def _wait_while(self, state):
+        while isinstance(await self.get_state(Priority.MOVE), state):
+            await asyncio.sleep(self.device.delay)
+        return await self._get_position(Priority.MOVE)
+
+    async def _move(self, command):
+        if isinstance(await self.get_state(Priority.MOVE), NotReferenced):
+            self.logger.warning("CONEX device needs to be homed.")
+            return None
+        while not isinstance(await self.get_state(Priority.MOVE), Ready):
+            await asyncio.sleep(self.device.delay)
+        await self.send_command(command, Priority.MOVE)
+        return await self._wait_while(Moving)
+
+    async def _home(self):
+        await self.send_command("OR", Priority.MOVE)
+        return await self._wait_while(Homing)
+
+    async def home(self, timeout=None):
+        return await self._stopping("home", asyncio.wait_for(self._home(), timeout))
+
+    async def move_absolute(self, value, timeout=None):
+        move = self._move(f"PA{value - self.device.offset}")
+        return await self._stopping("move_absolute", asyncio.wait_for(move, timeout))
+
+    async def move_relative(self, value, timeout=None):
+        move = self._move(f"PR{value}")
+        return await self._stopping("move_relative", asyncio.wait_for(move, timeout))
+
+    async def move_configuration(self, idx_or_name, timeout=None):
+        configurations = self.device.configurations
+        if isinstance(idx_or_name, int) or idx_or_name.isdigit():
+            row = configurations.by_index(int(idx_or_name))
+        else:
+            row = configurations.by_name(idx_or_name)
+        return await self.move_absolute(row.value, timeout=timeout)
+
+    async def stop(self):
+        await self.send_command("ST", Priority.STOP)
+        return await self._get_position(Priority.STOP)
+
+
+async def move_all(targets, timeout=None):
+    """
+    Move several stages to configurations concurrently.
+
+    Parameters
+    ----------
+    targets : dict
+        Mapping of `AsyncMotionDevice` to a configuration index or name
+    timeout : float, optional
+        Time allowed for the slowest stage, in s. Stages still moving are stopped.
+
+    Returns
+    -------
+    list
+        The results of each move, in the order of `targets`
+    """
+    tasks = [
+        asyncio.ensure_future(device.move_configuration(config))
+        for device, config in targets.items()
+    ]
+    try:
+        return await asyncio.wait_for(asyncio.gather(*tasks), timeout)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        # let the cancelled moves send their stops
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
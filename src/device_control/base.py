@@ -1,14 +1,16 @@
 from logging import getLogger
 from pathlib import Path
 
-import numpy as np
 import paramiko
 import tomli
 import tomli_w
-from serial import Serial
 from swmain.network.pyroclient import connect
 
 from device_control import conf_dir
+from device_control.interfaces import ConfigurationTable, transport_from_kwargs
+from device_control.scheduler import PortScheduler, Priority, with_priority
+from device_control.singleflight import SingleFlightMixin
+from device_control.ssh_pool import get_connection
 
 __all__ = ["ConfigurableDevice", "MotionDevice", "SSHDevice"]
 
@@ -16,7 +18,7 @@ __all__ = ["ConfigurableDevice", "MotionDevice", "SSHDevice"]
 # implement this!
 
 
-class ConfigurableDevice:
+class ConfigurableDevice(SingleFlightMixin):
     CONF = None
     PYRO_KEY = None
 
@@ -30,11 +32,31 @@ class ConfigurableDevice:
     ):
         self.serial_kwargs = {"timeout": 0.5}
         self.serial_kwargs.update(serial_kwargs)
-        self.serial = Serial(**self.serial_kwargs)
+        # shared with every other device on the same port, see `interfaces.get_transport`
+        self.serial = transport_from_kwargs(self.serial_kwargs)
         self.configurations = configurations
         self.config_file = config_file
         self.name = name
         self.logger = getLogger(self.__class__.__name__)
+        self._port_scheduler = None
+
+    @property
+    def port_scheduler(self) -> PortScheduler:
+        """Scheduler shared by every device on this device's serial port"""
+        if self._port_scheduler is None:
+            port = self.serial_kwargs.get("port")
+            if getattr(self, "serial", None) is not None:
+                self._port_scheduler = self.serial.scheduler
+            elif port is None:
+                self._port_scheduler = PortScheduler()
+            else:
+                self._port_scheduler = PortScheduler.for_port(port)
+        return self._port_scheduler
+
+    def get_io_metrics(self):
+        if getattr(self, "serial", None) is not None:
+            return self.serial.get_metrics()
+        return self.port_scheduler.get_metrics()
 
     @classmethod
     def from_config(__cls__, filename, **kwargs):
@@ -45,11 +67,12 @@ class ConfigurableDevice:
         return __cls__(serial_kwargs=serial_kwargs, config_file=filename, **parameters)
 
     @classmethod
-    def connect(__cls__, local=False, filename=None, pyro_key=None):
+    def connect(__cls__, local=False, filename=None, pyro_key=None, **kwargs):
+        # keyword arguments override the configuration file of local devices
         if local:
             if filename is None:
                 filename = conf_dir / __cls__.CONF
-            return __cls__.from_config(filename)
+            return __cls__.from_config(filename, **kwargs)
         if pyro_key is None:
             pyro_key = __cls__.PYRO_KEY
         return connect(pyro_key)
@@ -61,7 +84,7 @@ class ConfigurableDevice:
 
         config = {
             "name": self.name,
-            "configurations": self.configurations,
+            "configurations": self.get_configurations(),
             "serial": self.get_serial_kwargs(),
         }
         config.update(self._config_extras())
@@ -76,9 +99,13 @@ class ConfigurableDevice:
         return self.serial_kwargs
 
     def get_configurations(self):
+        if isinstance(self.configurations, ConfigurationTable):
+            return self.configurations.to_list()
         return self.configurations
 
     def set_configurations(self, value):
+        if isinstance(self.configurations, ConfigurationTable):
+            value = ConfigurationTable.from_list(value)
         self.configurations = value
 
     def get_name(self):
@@ -87,12 +114,18 @@ class ConfigurableDevice:
     def set_name(self, value: str):
         self.name = value
 
+    def disconnect(self):
+        """Release the connection to the hardware; called when the link is lost"""
+        if getattr(self, "serial", None) is not None:
+            self.serial.close()
+
 
 class MotionDevice(ConfigurableDevice):
     FORMAT_STR = "{0}: {1} {{{2}}}"
 
     def __init__(self, unit=None, offset=0, **kwargs):
         super().__init__(**kwargs)
+        self.configurations = ConfigurationTable.from_list(self.configurations)
         self.unit = unit
         self.offset = offset
 
@@ -126,6 +159,7 @@ class MotionDevice(ConfigurableDevice):
     def _get_target_position(self):
         raise NotImplementedError()
 
+    @with_priority(Priority.MOVE)
     def home(self):
         pos = self._home()
         self.update_keys(pos)
@@ -134,6 +168,7 @@ class MotionDevice(ConfigurableDevice):
     def _home(self):
         raise NotImplementedError()
 
+    @with_priority(Priority.MOVE)
     def move_absolute(self, value, **kwargs):
         pos = self._move_absolute(value - self.offset, **kwargs)
         self.update_keys(pos)
@@ -142,6 +177,7 @@ class MotionDevice(ConfigurableDevice):
     def _move_absolute(self, value):
         raise NotImplementedError()
 
+    @with_priority(Priority.MOVE)
     def move_relative(self, value):
         pos = self._move_relative(value)
         self.update_keys(pos)
@@ -168,33 +204,23 @@ class MotionDevice(ConfigurableDevice):
         return self.move_configuration_name(idx_or_name, **kwargs)
 
     def move_configuration_idx(self, idx: int, **kwargs):
-        for row in self.configurations:
-            if row["idx"] == idx:
-                return self.move_absolute(row["value"], **kwargs)
-        msg = f"No configuration saved at index {idx}"
-        raise ValueError(msg)
+        row = self.configurations.by_index(idx)
+        return self.move_absolute(row.value, **kwargs)
 
     def move_configuration_name(self, name: str, **kwargs):
-        for row in self.configurations:
-            if row["name"].lower() == name.lower():
-                return self.move_absolute(row["value"], **kwargs)
-        msg = f"No configuration saved with name '{name}'"
-        raise ValueError(msg)
+        row = self.configurations.by_name(name)
+        return self.move_absolute(row.value, **kwargs)
 
     def get_configuration(self, position=None, tol=1e-1):
         if position is None:
             position = self.get_position()
-        for row in self.configurations:
-            if np.abs(position - row["value"]) <= tol:
-                return row["idx"], row["name"]
-        return None, "Unknown"
+        row = self.configurations.nearest(position, tol=tol)
+        if row is None:
+            return None, "Unknown"
+        return row.index, row.name
 
     def get_config_index_from_name(self, name: str) -> int:
-        for config in self.configurations:
-            if name.lower() == config["name"].lower():
-                return config["idx"]
-        msg = f"Could not find configuration with name {name}"
-        raise ValueError(msg)
+        return self.configurations.by_name(name).index
 
     def save_configuration(self, position=None, index=None, name=None, tol=1e-1, **kwargs):
         if position is None:
@@ -209,15 +235,12 @@ class MotionDevice(ConfigurableDevice):
                 name = current_config[1]
 
         # see if existing configuration
-        for row in self.configurations:
-            if row["idx"] == index:
-                if name is not None:
-                    row["name"] = name
-                row["value"] = position
-                self.logger.info(
-                    f"updated configuration {index} '{row['name']}' to value {row['value']}"
-                )
-                break
+        row = self.configurations.get(index)
+        if row is not None:
+            if name is not None:
+                row.name = name
+            row.value = position
+            self.logger.info(f"updated configuration {index} '{row.name}' to value {row.value}")
         else:
             if name is None:
                 msg = "Must provide name for new configuration"
@@ -225,8 +248,6 @@ class MotionDevice(ConfigurableDevice):
             self.configurations.append(dict(idx=index, name=name, value=position))
             self.logger.info(f"added new configuration {index} '{name}' with value {position}")
 
-        # sort configurations dictionary in-place by index
-        self.configurations.sort(key=lambda d: d["idx"])
         # save configurations to file
         self.save_config(**kwargs)
         self.update_keys()
@@ -249,17 +270,18 @@ class SSHDevice:
         self.config_file = config_file
 
     def _prepare_sshclient(self, **kwargs):
-        self.client = paramiko.SSHClient()
-        self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        self.client.load_system_host_keys()
-        self.client.connect(self.host, username=self.user, **kwargs)
+        # shared with every other device on this host, see `device_control.ssh_pool`
+        self.connection = get_connection(self.host, user=self.user, **kwargs)
+
+    @property
+    def client(self) -> paramiko.SSHClient:
+        return self.connection.get_client()
 
     def send_command(self, command: str):
-        stdin, stdout, stderr = self.client.exec_command(command)
+        self.connection.exec_command(command, wait=False)
 
     def ask_command(self, command: str):
-        stdin, stdout, stderr = self.client.exec_command(command)
-        return stdout.read().decode()
+        return self.connection.exec_command(command)
 
     @classmethod
     def from_config(__cls__, filename, **kwargs):
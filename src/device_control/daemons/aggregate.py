@@ -0,0 +1,85 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from device_control.scheduler import Priority, io_priority
+
+__all__ = ["StatusAggregator"]
+
+
+class StatusAggregator:
+    """
+    Pyro object returning the status of every device in a daemon with one call.
+
+    Devices are read concurrently on the daemon side. Each entry of the returned dict is
+    compact, with keys
+
+    - ``t``: unix time the read finished
+    - ``s``: the device's ``get_status()`` result, or None
+    - ``e``: the error message, or None
+    - ``stale``: True if the device is down and ``s`` is its last cached status
+
+    A device whose read from an earlier call is still running is not read again; it
+    is waited on like the others, and if it does not finish in time its last status
+    is returned, marked stale.
+    """
+
+    def __init__(self, devices, timeout=5):
+        self.devices = devices
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(len(devices), 1), thread_name_prefix="status"
+        )
+        # at most one read per device in flight, so a hung device keeps only its own worker
+        self._pending = {}
+        self._last = {}
+        self._lock = threading.Lock()
+
+    def get_devices(self):
+        return list(self.devices.keys())
+
+    def get_status(self, keys=None, timeout=None, priority=Priority.STATUS):
+        """
+        Get the status of the given devices (default all), waiting at most `timeout`
+        seconds for the slowest one. The port transactions are made at `priority`.
+        """
+        if keys is None:
+            keys = self.devices.keys()
+        if timeout is None:
+            timeout = self.timeout
+        priority = Priority(priority)
+        futures = {}
+        with self._lock:
+            for key in keys:
+                future = self._pending.get(key)
+                if future is None or future.done():
+                    future = self._pending[key] = self._executor.submit(self._read, key, priority)
+                futures[key] = future
+        wait(futures.values(), timeout=timeout)
+        output = {}
+        with self._lock:
+            for key, future in futures.items():
+                if future.done():
+                    output[key] = self._last[key] = future.result()
+                elif key in self._last:
+                    output[key] = dict(self._last[key], e="timeout", stale=True)
+                else:
+                    output[key] = {"t": time.time(), "s": None, "e": "timeout", "stale": False}
+        return output
+
+    def _read(self, key, priority):
+        device = self.devices[key]
+        stale = False
+        try:
+            with io_priority(priority):
+                if hasattr(device, "query"):
+                    # device proxies tell whether this status came from their cache
+                    result = device.query("get_status")
+                    status, stale = result["value"], result["stale"]
+                else:
+                    status = device.get_status()
+            error = None
+        except Exception as exc:
+            status = None
+            error = repr(exc)
+        return {"t": time.time(), "s": status, "e": error, "stale": stale}
@@ -0,0 +1,126 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+__all__ = ["BatchExecutor"]
+
+
+class BatchExecutor:
+    """
+    Pyro object running many device calls in one round trip.
+
+    A batch is a list of ``(device, method, args)`` or ``(device, method, args, kwargs)``
+    calls. They run one after the other, or with ``parallel=True`` the devices run
+    concurrently while the calls to each device keep their order. Either way one
+    reply holds an entry per call, in the order given, with keys
+
+    - ``r``: the call's return value, or None
+    - ``e``: the error message, None if the call succeeded
+    - ``dt``: time the call took, in s
+
+    Only public methods can be called. Calls which have not started when the timeout
+    expires are skipped and reported as timed out. In parallel batches, a device still
+    running calls from an earlier batch is reported as busy rather than queued.
+    """
+
+    def __init__(self, devices, timeout=None):
+        self.devices = devices
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(len(devices), 1), thread_name_prefix="batch"
+        )
+        # running call group of each device, so a hung device keeps only its own worker
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def get_devices(self):
+        return list(self.devices.keys())
+
+    def run(self, calls, parallel=False, stop_on_error=False, timeout=None):
+        """
+        Run a batch of calls and return their results.
+
+        Parameters
+        ----------
+        calls : list
+            ``(device, method, args[, kwargs])`` for each call
+        parallel : bool, optional
+            If True, run the calls to different devices concurrently
+        stop_on_error : bool, optional
+            If True, skip the calls after a failed one (with ``parallel``, only the
+            following calls to the same device)
+        timeout : float, optional
+            Time allowed for the whole batch, in s. Calls still running are reported as
+            timed out.
+
+        Returns
+        -------
+        list of dict
+            One entry per call, see `BatchExecutor`
+        """
+        if timeout is None:
+            timeout = self.timeout
+        calls = [self._parse(call) for call in calls]
+        results = [None] * len(calls)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if not parallel:
+            self._run_calls(list(enumerate(calls)), results, stop_on_error, deadline)
+            return results
+
+        groups = {}
+        for i, call in enumerate(calls):
+            groups.setdefault(call[0], []).append((i, call))
+        futures = []
+        with self._lock:
+            for key, group in groups.items():
+                pending = self._pending.get(key)
+                if pending is not None and not pending.done():
+                    for i, _ in group:
+                        results[i] = _entry(None, f"device '{key}' busy with an earlier batch", 0)
+                    continue
+                future = self._executor.submit(
+                    self._run_calls, group, results, stop_on_error, deadline
+                )
+                self._pending[key] = future
+                futures.append(future)
+        wait(futures, timeout=timeout)
+        # the workers keep filling in `results` after a timeout
+        with self._lock:
+            return [_entry(None, "timeout", 0) if entry is None else entry for entry in results]
+
+    @staticmethod
+    def _parse(call):
+        # serpent turns tuples into lists
+        device, method, *rest = call
+        args = rest[0] if len(rest) > 0 and rest[0] is not None else ()
+        kwargs = rest[1] if len(rest) > 1 and rest[1] is not None else {}
+        return device, method, tuple(args), dict(kwargs)
+
+    def _run_calls(self, calls, results, stop_on_error, deadline=None):
+        failed = False
+        for i, (device, method, args, kwargs) in calls:
+            if failed and stop_on_error:
+                entry = _entry(None, "skipped", 0)
+            elif deadline is not None and time.monotonic() > deadline:
+                entry = _entry(None, "timeout", 0)
+            else:
+                entry = self._call(device, method, args, kwargs)
+                failed = entry["e"] is not None
+            with self._lock:
+                results[i] = entry
+
+    def _call(self, key, method, args, kwargs):
+        t0 = time.monotonic()
+        if key not in self.devices:
+            return _entry(None, f"unknown device '{key}'", 0)
+        if method.startswith("_"):
+            return _entry(None, f"cannot call private method '{method}'", 0)
+        try:
+            result = getattr(self.devices[key], method)(*args, **kwargs)
+        except Exception as exc:
+            return _entry(None, repr(exc), time.monotonic() - t0)
+        return _entry(result, None, time.monotonic() - t0)
+
+
+def _entry(result, error, elapsed):
+    return {"r": result, "e": error, "dt": elapsed}
@@ -0,0 +1,262 @@
+import functools
+import inspect
+import threading
+import time
+from concurrent.futures import Future, wait
+from logging import getLogger
+
+from serial import SerialException
+from usb.core import USBError
+from zaber_motion.exceptions import ConnectionClosedException, ConnectionFailedException
+
+__all__ = ["DeviceProxy", "DeviceUnavailableError", "make_proxy"]
+
+# errors which mean the hardware link is gone, rather than a bad request or a slow
+# device; timeouts (moves, prompts, port transactions) never mark a device down
+CONNECTION_ERRORS = (
+    SerialException,
+    USBError,
+    ConnectionError,
+    EOFError,
+    ConnectionFailedException,
+    ConnectionClosedException,
+)
+
+
+def _is_disconnect(exc):
+    return isinstance(exc, CONNECTION_ERRORS) and not isinstance(exc, TimeoutError)
+
+
+class DeviceUnavailableError(RuntimeError):
+    pass
+
+
+class DeviceProxy:
+    """
+    Stand-in for a device which can be registered with Pyro before the hardware is up.
+
+    The device is constructed on first use. If a call fails with a connection error the
+    device is dropped and a background thread reconnects it with exponential backoff.
+    While the hardware is down, calls fail at once with `DeviceUnavailableError` instead
+    of trying to connect, except for query methods (``get_*``), which return the last
+    value they returned. `query` returns a value together with whether it was cached.
+
+    A connection attempt which takes longer than `connect_timeout` is abandoned (a hung
+    port), and retried by the reconnect thread. If the abandoned attempt does connect in
+    the end, its device is used.
+    """
+
+    def __init__(
+        self, key, connect_func, pyro_key, min_backoff=1, max_backoff=60, connect_timeout=30
+    ):
+        self.key = key
+        self.PYRO_KEY = pyro_key
+        self._connect_func = connect_func
+        self._device = None
+        self._connect_lock = threading.Lock()
+        self._reconnect_thread = None
+        self._cache = {}
+        self._stale = False
+        self._last_error = None
+        self._last_success = None
+        self._retries = 0
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.connect_timeout = connect_timeout  # s
+        self.logger = getLogger(f"{self.__class__.__name__}[{key}]")
+
+    def connect(self, wait=False):
+        """
+        Connect the hardware now, returning the device. Raises if it could not connect.
+
+        If another thread is connecting, raises `DeviceUnavailableError`, or with `wait`
+        waits for it to finish first.
+        """
+        device = self._device
+        if device is not None:
+            return device
+        if not self._connect_lock.acquire(blocking=wait):
+            msg = f"{self.key} is still connecting"
+            raise DeviceUnavailableError(msg)
+        try:
+            # another thread may have finished connecting while we waited
+            if self._device is None:
+                self._device = self._attempt()
+                self._retries = 0
+                self.logger.info("connected")
+            return self._device
+        except Exception as exc:
+            self._last_error = repr(exc)
+            self._start_reconnect()
+            raise
+        finally:
+            self._connect_lock.release()
+
+    def _attempt(self):
+        # connect in a thread of its own, so a hung port doesn't hold the lock forever
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(self._connect_func())
+            except BaseException as exc:
+                future.set_exception(exc)
+
+        threading.Thread(target=run, name=f"connect-{self.key}", daemon=True).start()
+        wait([future], timeout=self.connect_timeout)
+        if future.done():
+            return future.result()
+        future.add_done_callback(self._late_connect)
+        msg = f"{self.key} did not connect within {self.connect_timeout} s"
+        raise DeviceUnavailableError(msg)
+
+    def _late_connect(self, future):
+        if future.exception() is None and self._device is None:
+            self._device = future.result()
+            self.logger.info("connected after the connection timeout")
+
+    def is_connected(self) -> bool:
+        return self._device is not None
+
+    def is_stale(self) -> bool:
+        """Whether the latest call was served from the cache"""
+        return self._stale
+
+    def is_reconnecting(self) -> bool:
+        return self._reconnect_thread is not None and self._reconnect_thread.is_alive()
+
+    def get_proxy_status(self):
+        return {
+            "connected": self.is_connected(),
+            "reconnecting": self.is_reconnecting(),
+            "stale": self._stale,
+            "last_error": self._last_error,
+            "last_success": self._last_success,
+            "retries": self._retries,
+        }
+
+    def _call(self, name, *args, **kwargs):
+        return self.query(name, *args, **kwargs)["value"]
+
+    def query(self, name, *args, **kwargs):
+        """
+        Call a device method, returning a dict with its result (``value``), whether the
+        result is a cached one because the device is down (``stale``), and the unix time
+        it was read (``t``).
+        """
+        if name.startswith("_"):
+            msg = f"cannot call private method '{name}'"
+            raise AttributeError(msg)
+        cache_key = self._cache_key(name, args, kwargs)
+        try:
+            device = self._device
+            if device is None:
+                if self.is_reconnecting():
+                    # leave the connection attempts to the backoff of the reconnect thread
+                    msg = f"{self.key} is down, reconnecting"
+                    raise DeviceUnavailableError(msg)
+                device = self.connect()
+            result = getattr(device, name)(*args, **kwargs)
+        except Exception as exc:
+            if _is_disconnect(exc):
+                self._mark_down(exc)
+            elif not isinstance(exc, DeviceUnavailableError):
+                raise
+            if cache_key in self._cache:
+                self._stale = True
+                self.logger.debug(f"{name} served from cache: {exc!r}")
+                return dict(self._cache[cache_key], stale=True)
+            raise
+        t = time.time()
+        self._last_success = t
+        self._stale = False
+        entry = {"value": result, "stale": False, "t": t}
+        if cache_key is not None:
+            self._cache[cache_key] = entry
+        return entry
+
+    @staticmethod
+    def _cache_key(name, args, kwargs):
+        if not name.startswith("get_"):
+            return None
+        key = (name, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def _mark_down(self, exc):
+        self.logger.warning(f"lost connection: {exc!r}")
+        self._last_error = repr(exc)
+        device, self._device = self._device, None
+        if device is not None and hasattr(device, "disconnect"):
+            # let the driver drop anything it keeps across connections (e.g. open ports)
+            try:
+                device.disconnect()
+            except Exception as disconnect_exc:
+                self.logger.debug(f"disconnect failed: {disconnect_exc!r}")
+        self._start_reconnect()
+
+    def _start_reconnect(self):
+        if self._reconnect_thread is not None and self._reconnect_thread.is_alive():
+            return
+        self._reconnect_thread = threading.Thread(
+            target=self._reconnect_loop, name=f"reconnect-{self.key}", daemon=True
+        )
+        self._reconnect_thread.start()
+
+    def _reconnect_loop(self):
+        backoff = self.min_backoff
+        while self._device is None:
+            time.sleep(backoff)
+            self._retries += 1
+            try:
+                self.connect()
+            except Exception as exc:
+                self.logger.debug(f"reconnect attempt {self._retries} failed: {exc!r}")
+                backoff = min(2 * backoff, self.max_backoff)
+
+
+def _device_class(connect_func):
+    # DEVICE_MAP entries are partials of a `connect` classmethod
+    func = getattr(connect_func, "func", connect_func)
+    return getattr(func, "__self__", None)
+
+
+def _forward(name, method):
+    @functools.wraps(method)
+    def forward(self, *args, **kwargs):
+        return self._call(name, *args, **kwargs)
+
+    return forward
+
+
+@functools.cache
+def _proxy_class(device_cls):
+    # mirror the public methods of the device class so that Pyro exposes them
+    methods = {}
+    for name in dir(device_cls):
+        if name.startswith("_") or hasattr(DeviceProxy, name):
+            continue
+        attr = inspect.getattr_static(device_cls, name)
+        if isinstance(attr, classmethod | staticmethod) or not callable(attr):
+            continue
+        methods[name] = _forward(name, attr)
+    return type(f"{device_cls.__name__}Proxy", (DeviceProxy,), methods)
+
+
+def make_proxy(key, connect_func, pyro_key=None, **kwargs):
+    """
+    Create a lazy proxy for a daemon `DEVICE_MAP` entry.
+
+    The Pyro key is taken from the device class unless given explicitly (e.g., for
+    devices which only set it on the instance).
+    """
+    device_cls = _device_class(connect_func)
+    if pyro_key is None:
+        pyro_key = getattr(device_cls, "PYRO_KEY", None)
+    if device_cls is None or pyro_key is None:
+        msg = f"Cannot determine device class and Pyro key for {key}"
+        raise ValueError(msg)
+    return _proxy_class(device_cls)(key, connect_func, pyro_key, **kwargs)
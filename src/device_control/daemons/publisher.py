@@ -0,0 +1,203 @@
+import threading
+import time
+import uuid
+from logging import getLogger
+
+from device_control.daemons.proxy import DeviceProxy
+from device_control.scheduler import Priority
+
+__all__ = ["StatusPublisher"]
+
+
+def _has_position(device):
+    # devices with configurations report their status as (position, status line)
+    return hasattr(device, "get_configuration")
+
+
+def _configuration(device, position):
+    # ask the device itself, through the proxy every new position would be cached. Down
+    # devices are skipped, connecting is left to the proxy's reconnect thread.
+    try:
+        if isinstance(device, DeviceProxy):
+            if not device.is_connected():
+                return None
+            device = device.connect()
+        _, name = device.get_configuration(position)
+    except Exception:
+        return None
+    return name
+
+
+def _values(device, entry):
+    # event values of one read, an entry of `StatusAggregator.get_status`
+    if entry["e"] is not None:
+        return {"error": entry["e"]}
+    status = entry["s"]
+    values = {"error": None, "stale": entry["stale"], "status": status}
+    if _has_position(device) and status is not None:
+        position, values["status"] = status
+        values["position"] = position
+        name = _configuration(device, position)
+        if name is not None:
+            values["configuration"] = name
+    return values
+
+
+class _Subscriber:
+    def __init__(self, devices=None, keys=None, interval=0):
+        self.devices = None if devices is None else set(devices)
+        self.keys = None if keys is None else set(keys)
+        self.interval = interval  # s
+        # latest event of each (device, key), in order of first change
+        self.pending = {}
+        self.last_delivery = -float("inf")
+        self.last_poll = time.monotonic()
+
+    def push(self, device, key, value, t):
+        if self.devices is not None and device not in self.devices:
+            return
+        if self.keys is not None and key not in self.keys:
+            return
+        self.pending[(device, key)] = {"device": device, "key": key, "value": value, "t": t}
+
+
+class StatusPublisher:
+    """
+    Pyro object pushing device status changes to subscribers, so any number of status
+    displays costs one poll of the hardware.
+
+    While anyone is subscribed, one thread reads every device through the
+    `StatusAggregator` every `interval` seconds, at POLL priority so that commands are
+    never held up. Each read is turned into values, and an event is published for each
+    value which changed:
+
+    - ``position``: the position of devices with configurations (``get_configuration``)
+    - ``configuration``: the name of the configuration at that position
+    - ``moving``: True when the position starts changing, False once it settles
+    - ``status``: the device's status (line)
+    - ``stale``: True while the device is down and the status is its last known one
+    - ``error``: the error of a failed read, None once reads succeed again
+
+    An event is a dict with keys ``device``, ``key``, ``value`` and ``t`` (unix time of
+    the read). Clients choose devices and keys with `subscribe`, which queues the current
+    values, and fetch events with `poll_events`, which waits until there are some.
+    Events are coalesced per subscriber: only the latest value of each device and key
+    is kept, and deliveries are at least the subscriber's interval apart. Subscribers
+    which stop polling for `expiry` seconds are dropped.
+    """
+
+    def __init__(self, aggregator, interval=1, expiry=60, timeout=5):
+        self.aggregator = aggregator
+        self.interval = interval  # s
+        self.expiry = expiry  # s
+        self.timeout = timeout  # s
+        self.logger = getLogger(self.__class__.__name__)
+        self._values = {}
+        self._subscribers = {}
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def get_devices(self):
+        return self.aggregator.get_devices()
+
+    def get_subscriber_count(self):
+        return len(self._subscribers)
+
+    def subscribe(self, devices=None, keys=None, interval=0):
+        """
+        Subscribe to the events of the given devices and keys (default all), delivered
+        at most every `interval` seconds. Returns the subscription ID for `poll_events`.
+        """
+        with self._cond:
+            # random, so IDs from before a daemon restart never match a new subscription
+            sub_id = uuid.uuid4().hex
+            subscriber = _Subscriber(devices, keys, interval)
+            t = time.time()
+            for device, values in self._values.items():
+                for key, value in values.items():
+                    subscriber.push(device, key, value, t)
+            self._subscribers[sub_id] = subscriber
+            self._start()
+        return sub_id
+
+    def unsubscribe(self, sub_id):
+        with self._cond:
+            self._subscribers.pop(sub_id, None)
+            self._cond.notify_all()
+
+    def poll_events(self, sub_id, timeout=10):
+        """
+        Wait up to `timeout` seconds for events and return them (an empty list if there
+        were none). Raises ValueError if the subscription is unknown or has expired.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            subscriber = self._subscribers.get(sub_id)
+            if subscriber is None:
+                msg = f"unknown subscription {sub_id}, subscribe again"
+                raise ValueError(msg)
+            while True:
+                now = time.monotonic()
+                subscriber.last_poll = now
+                ready = subscriber.last_delivery + subscriber.interval
+                if len(subscriber.pending) > 0 and now >= ready:
+                    break
+                if now >= deadline or self._subscribers.get(sub_id) is not subscriber:
+                    return []
+                wake = deadline if len(subscriber.pending) == 0 else min(deadline, ready)
+                self._cond.wait(wake - now)
+            events = list(subscriber.pending.values())
+            subscriber.pending.clear()
+            subscriber.last_delivery = time.monotonic()
+        return events
+
+    def publish(self, device, values, t=None):
+        """Publish the values of a device which changed since they were last published"""
+        if t is None:
+            t = time.time()
+        with self._cond:
+            previous = self._values.setdefault(device, {})
+            if "position" in values:
+                moved = "position" in previous and values["position"] != previous["position"]
+                values["moving"] = bool(moved)
+            changed = {k: v for k, v in values.items() if k not in previous or previous[k] != v}
+            if len(changed) == 0:
+                return
+            previous.update(changed)
+            for subscriber in self._subscribers.values():
+                for key, value in changed.items():
+                    subscriber.push(device, key, value, t)
+            self._cond.notify_all()
+
+    def poll(self):
+        """Read every device once and publish what changed"""
+        entries = self.aggregator.get_status(timeout=self.timeout, priority=Priority.POLL)
+        for key, entry in entries.items():
+            self.publish(key, _values(self.aggregator.devices[key], entry), entry["t"])
+
+    def _start(self):
+        # called with the condition held
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._poll_loop, name="status-publisher", daemon=True
+            )
+            self._thread.start()
+
+    def _poll_loop(self):
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                for sub_id, subscriber in list(self._subscribers.items()):
+                    if now - subscriber.last_poll > self.expiry:
+                        del self._subscribers[sub_id]
+                if len(self._subscribers) == 0:
+                    # nobody is listening, stop reading the hardware
+                    self._thread = None
+                    self._values.clear()
+                    return
+            t0 = time.monotonic()
+            try:
+                self.poll()
+            except Exception:
+                self.logger.exception("failed to publish device status")
+            time.sleep(max(self.interval - (time.monotonic() - t0), 0))
@@ -3,16 +3,32 @@ from functools import partial
 
 import click
 from scxconf import IP_SC2, PYRONS3_HOST, PYRONS3_PORT
+from scxconf.pyrokeys import VAMPIRES
 from superk_control.superk import SuperK
 from swmain.infra.badsystemd.aux import auto_register_to_watchers
 from swmain.network.pyroserver_registerable import PyroServer
 
+from device_control.daemons.aggregate import StatusAggregator
+from device_control.daemons.batch import BatchExecutor
+from device_control.daemons.publisher import StatusPublisher
+from device_control.daemons.startup import DEFAULT_TIMEOUT, initialize_devices
+from device_control.pyro_keys import SCEXAO2 as DAEMON_KEYS
 from device_control.scexao import VAMPIRESQWP, SCEXAOPolarizer
 
 parser = ArgumentParser(
     prog="scexao2_devices",
     description="Launch the daemon for the devices controlled by the scexao2 computer.",
 )
+parser.add_argument(
+    "-t",
+    "--timeout",
+    type=float,
+    default=DEFAULT_TIMEOUT,
+    help="Time allowed for each device to connect, in s",
+)
+parser.add_argument(
+    "--lazy", action="store_true", help="Don't connect any hardware until each device is first used"
+)
 
 DEVICE_MAP = {
     "superk": partial(SuperK.connect, local=True),
@@ -20,25 +36,39 @@ DEVICE_MAP = {
     "qwp1": partial(VAMPIRESQWP.connect, 1, local=True),
     "qwp2": partial(VAMPIRESQWP.connect, 2, local=True),
 }
+# devices which only know their Pyro key once constructed
+PYRO_KEYS = {"qwp1": VAMPIRES.QWP1, "qwp2": VAMPIRES.QWP2}
 
 
 def main():
-    parser.parse_args()
+    args = parser.parse_args()
     auto_register_to_watchers("SC2_PYRO", "SC2 PyRO devices")
     server = PyroServer(bindTo=(IP_SC2, 0), nsAddress=(PYRONS3_HOST, PYRONS3_PORT))
     ## create device objects
     click.echo("Initializing devices")
-    available = []
-    for key, connect_func in DEVICE_MAP.items():
-        try:
-            device = connect_func()
-            ## Add to Pyro server
-            click.echo(f" - {key}: {device.PYRO_KEY}")
-            globals()[key] = device
-            server.add_device(device, device.PYRO_KEY, add_oneway_callables=True)
-            available.append(key)
-        except Exception:
-            click.secho(f" ! Failed to connect {key}", bg=(114, 24, 23), fg=(224, 224, 226))
+    devices = initialize_devices(
+        server, DEVICE_MAP, timeout=args.timeout, pyro_keys=PYRO_KEYS, lazy=args.lazy
+    )
+    globals().update(devices)
+    available = list(devices.keys())
+    ## daemon-wide status of all devices in one call
+    status = StatusAggregator(devices)
+    server.add_device(status, DAEMON_KEYS.STATUS, add_oneway_callables=True)
+    click.echo(f" - status: {DAEMON_KEYS.STATUS}")
+    globals()["status"] = status
+    available.append("status")
+    ## batches of calls to any device in one round trip
+    batch = BatchExecutor({**devices, "status": status})
+    server.add_device(batch, DAEMON_KEYS.BATCH, add_oneway_callables=True)
+    click.echo(f" - batch: {DAEMON_KEYS.BATCH}")
+    globals()["batch"] = batch
+    available.append("batch")
+    ## status change events, polled once for every subscriber
+    events = StatusPublisher(status)
+    server.add_device(events, DAEMON_KEYS.EVENTS, add_oneway_callables=True)
+    click.echo(f" - events: {DAEMON_KEYS.EVENTS}")
+    globals()["events"] = events
+    available.append("events")
 
     click.echo("\nThe following variables are available in the shell:")
     click.secho(", ".join(available), bold=True)
@@ -0,0 +1,136 @@
+import queue
+import threading
+import time
+
+import click
+
+from device_control.daemons.proxy import make_proxy
+
+__all__ = ["initialize_devices"]
+
+# default time allowed for a single device to connect, in s
+DEFAULT_TIMEOUT = 30
+
+
+def _connect_worker(key, proxy, results):
+    t0 = time.monotonic()
+    try:
+        device = proxy.connect()
+    except Exception as exc:
+        results.put((key, None, exc, time.monotonic() - t0))
+    else:
+        results.put((key, device, None, time.monotonic() - t0))
+
+
+def initialize_devices(
+    server, device_map, timeout=DEFAULT_TIMEOUT, timeouts=None, pyro_keys=None, lazy=False
+):
+    """
+    Register a lazy proxy for every device in `device_map` with the Pyro server and
+    connect the hardware behind them concurrently.
+
+    Every proxy is registered up front, so a device which fails to connect is still
+    reachable and reconnects in the background (see `DeviceProxy`). Each device gets its
+    own connection deadline, which is also its proxy's `connect_timeout`, so a device
+    whose port hangs at startup is retried by its reconnect thread.
+
+    Parameters
+    ----------
+    server : PyroServer
+        Server the devices are added to
+    device_map : dict
+        Mapping of shell variable name to a zero-argument connect function
+    timeout : float, optional
+        Default deadline for each device, in s
+    timeouts : dict, optional
+        Per-device deadlines overriding `timeout`, in s
+    pyro_keys : dict, optional
+        Pyro keys for devices whose class does not define `PYRO_KEY`
+    lazy : bool, optional
+        If True, don't connect any hardware until the first call to each device
+
+    Returns
+    -------
+    dict
+        The device proxies, keyed like `device_map`
+    """
+    if timeouts is None:
+        timeouts = {}
+    if pyro_keys is None:
+        pyro_keys = {}
+    proxies = {}
+    for key, connect_func in device_map.items():
+        try:
+            proxy = make_proxy(
+                key,
+                connect_func,
+                pyro_key=pyro_keys.get(key),
+                connect_timeout=timeouts.get(key, timeout),
+            )
+            ## Add to Pyro server
+            server.add_device(proxy, proxy.PYRO_KEY, add_oneway_callables=True)
+        except Exception as exc:
+            click.secho(
+                f" ! Failed to register {key}: {exc!r}", bg=(114, 24, 23), fg=(224, 224, 226)
+            )
+            continue
+        proxies[key] = proxy
+    if lazy:
+        for key, proxy in proxies.items():
+            click.echo(f" - {key}: {proxy.PYRO_KEY} (connects on first use)")
+        return proxies
+
+    results = queue.Queue()
+    t0 = time.monotonic()
+    deadlines = {}
+    for key, proxy in proxies.items():
+        deadlines[key] = t0 + timeouts.get(key, timeout)
+        thread = threading.Thread(
+            target=_connect_worker, args=(key, proxy, results), name=f"connect-{key}", daemon=True
+        )
+        thread.start()
+
+    summary = {}
+    pending = set(proxies.keys())
+    while pending:
+        next_deadline = min(deadlines[k] for k in pending)
+        try:
+            key, device, error, elapsed = results.get(
+                timeout=max(0, next_deadline - time.monotonic())
+            )
+        except queue.Empty:
+            now = time.monotonic()
+            for key in [k for k in pending if deadlines[k] <= now]:
+                pending.remove(key)
+                summary[key] = ("timeout", now - t0)
+                click.secho(
+                    f" ! Timed out connecting {key} after {now - t0:.1f} s",
+                    bg=(114, 24, 23),
+                    fg=(224, 224, 226),
+                )
+            continue
+
+        if key not in pending:
+            # already reported as timed out
+            continue
+        pending.remove(key)
+        if error is not None:
+            summary[key] = ("failed", elapsed)
+            click.secho(
+                f" ! Failed to connect {key}: {error!r}", bg=(114, 24, 23), fg=(224, 224, 226)
+            )
+            continue
+        summary[key] = ("ok", elapsed)
+        click.echo(f" - {key}: {proxies[key].PYRO_KEY} ({elapsed:.2f} s)")
+
+    _print_summary(proxies.keys(), summary, time.monotonic() - t0)
+    return proxies
+
+
+def _print_summary(keys, summary, total_time):
+    click.echo("\nStartup summary:")
+    for key in keys:
+        state, elapsed = summary[key]
+        color = "green" if state == "ok" else "red"
+        click.echo(f"   {key:12s} " + click.style(f"{state:8s}", fg=color) + f" {elapsed:6.2f} s")
+    click.echo(f"   {'total':12s} {'':8s} {total_time:6.2f} s")
@@ -6,6 +6,11 @@ from scxconf import IP_VAMPIRES, PYRONS3_HOST, PYRONS3_PORT
 from swmain.infra.badsystemd.aux import auto_register_to_watchers
 from swmain.network.pyroserver_registerable import PyroServer
 
+from device_control.daemons.aggregate import StatusAggregator
+from device_control.daemons.batch import BatchExecutor
+from device_control.daemons.publisher import StatusPublisher
+from device_control.daemons.startup import DEFAULT_TIMEOUT, initialize_devices
+from device_control.pyro_keys import VAMPIRES as DAEMON_KEYS
 from device_control.vampires import (
     VAMPIRESTC,
     VAMPIRESBeamsplitter,
@@ -32,7 +37,8 @@ DEVICE_MAP = {
     "mask": partial(VAMPIRESMaskWheel.connect, local=True),
     "mbi": partial(VAMPIRESMBIWheel.connect, local=True),
     "puplens": partial(VAMPIRESPupilLens.connect, local=True),
-    "tc": partial(VAMPIRESTC.connect, local=True),
+    # only the daemon samples the temperature continuously, not the command line tools
+    "tc": partial(VAMPIRESTC.connect_monitored, monitor_interval=5),
     "trig": partial(VAMPIRESTrigger.connect, local=True),
 }
 
@@ -40,25 +46,45 @@ parser = argparse.ArgumentParser(
     "vampires_devices",
     description="Launch the daemon for the devices controlled by the VAMPIRES computer.",
 )
+parser.add_argument(
+    "-t",
+    "--timeout",
+    type=float,
+    default=DEFAULT_TIMEOUT,
+    help="Time allowed for each device to connect, in s",
+)
+parser.add_argument(
+    "--lazy", action="store_true", help="Don't connect any hardware until each device is first used"
+)
 
 
 def main():
-    parser.parse_args()
+    args = parser.parse_args()
     auto_register_to_watchers("VAMP_PYRO", "VAMPIRES PyRO devices")
     server = PyroServer(bindTo=(IP_VAMPIRES, 0), nsAddress=(PYRONS3_HOST, PYRONS3_PORT))
     ## create device objects
     click.echo("Initializing devices")
-    available = []
-    for key, connect_func in DEVICE_MAP.items():
-        try:
-            device = connect_func()
-            ## Add to Pyro server
-            click.echo(f" - {key}: {device.PYRO_KEY}")
-            globals()[key] = device
-            server.add_device(device, device.PYRO_KEY, add_oneway_callables=True)
-            available.append(key)
-        except Exception:
-            click.secho(f" ! Failed to connect {key.upper()}", bg=(114, 24, 23), fg=(224, 224, 226))
+    devices = initialize_devices(server, DEVICE_MAP, timeout=args.timeout, lazy=args.lazy)
+    globals().update(devices)
+    available = list(devices.keys())
+    ## daemon-wide status of all devices in one call
+    status = StatusAggregator(devices)
+    server.add_device(status, DAEMON_KEYS.STATUS, add_oneway_callables=True)
+    click.echo(f" - status: {DAEMON_KEYS.STATUS}")
+    globals()["status"] = status
+    available.append("status")
+    ## batches of calls to any device in one round trip
+    batch = BatchExecutor({**devices, "status": status})
+    server.add_device(batch, DAEMON_KEYS.BATCH, add_oneway_callables=True)
+    click.echo(f" - batch: {DAEMON_KEYS.BATCH}")
+    globals()["batch"] = batch
+    available.append("batch")
+    ## status change events, polled once for every subscriber
+    events = StatusPublisher(status)
+    server.add_device(events, DAEMON_KEYS.EVENTS, add_oneway_callables=True)
+    click.echo(f" - events: {DAEMON_KEYS.EVENTS}")
+    globals()["events"] = events
+    available.append("events")
 
     click.echo("\nThe following variables are available in the shell:")
     click.secho(", ".join(available), bold=True)
@@ -4,6 +4,11 @@ from functools import partial
 import click
 from scxconf import IP_AORTS_SUMMIT, PYRONS3_HOST, PYRONS3_PORT
 
+from device_control.daemons.aggregate import StatusAggregator
+from device_control.daemons.batch import BatchExecutor
+from device_control.daemons.publisher import StatusPublisher
+from device_control.daemons.startup import DEFAULT_TIMEOUT, initialize_devices
+from device_control.pyro_keys import VISWFS as DAEMON_KEYS
 from device_control.viswfs import (
     VISWFSPickoffBS,
     VISWFSCamFocus,
@@ -31,28 +36,44 @@ parser = argparse.ArgumentParser(
     "viswfs_devices",
     description="Launch the daemon for the devices controlled by the AORTS computer.",
 )
+parser.add_argument(
+    "-t",
+    "--timeout",
+    type=float,
+    default=DEFAULT_TIMEOUT,
+    help="Time allowed for each device to connect, in s",
+)
+parser.add_argument(
+    "--lazy", action="store_true", help="Don't connect any hardware until each device is first used"
+)
 
 
 def main():
-    parser.parse_args()
+    args = parser.parse_args()
     server = PyroServer(bindTo=(IP_AORTS_SUMMIT, 0), nsAddress=(PYRONS3_HOST, PYRONS3_PORT))
     ## create device objects
     click.echo("Initializing devices")
-    available = []
-    for key, connect_func in DEVICE_MAP.items():
-        try:
-            device = connect_func()
-            ## Add to Pyro server
-            click.echo(f" - {key}: {device.PYRO_KEY}")
-            globals()[key] = device
-            server.add_device(device, device.PYRO_KEY, add_oneway_callables=True)
-            available.append(key)
-        except:
-            click.secho(
-                f" ! Failed to connect {key} : {device.PYRO_KEY}",
-                bg=(114, 24, 23),
-                fg=(224, 224, 226),
-            )
+    devices = initialize_devices(server, DEVICE_MAP, timeout=args.timeout, lazy=args.lazy)
+    globals().update(devices)
+    available = list(devices.keys())
+    ## daemon-wide status of all devices in one call
+    status = StatusAggregator(devices)
+    server.add_device(status, DAEMON_KEYS.STATUS, add_oneway_callables=True)
+    click.echo(f" - status: {DAEMON_KEYS.STATUS}")
+    globals()["status"] = status
+    available.append("status")
+    ## batches of calls to any device in one round trip
+    batch = BatchExecutor({**devices, "status": status})
+    server.add_device(batch, DAEMON_KEYS.BATCH, add_oneway_callables=True)
+    click.echo(f" - batch: {DAEMON_KEYS.BATCH}")
+    globals()["batch"] = batch
+    available.append("batch")
+    ## status change events, polled once for every subscriber
+    events = StatusPublisher(status)
+    server.add_device(events, DAEMON_KEYS.EVENTS, add_oneway_callables=True)
+    click.echo(f" - events: {DAEMON_KEYS.EVENTS}")
+    globals()["events"] = events
+    available.append("events")
 
     click.echo(f"\nThe following variables are available in the shell:")
     click.secho(", ".join(available), bold=True)
@@ -1,6 +1,7 @@
 import logging
 
 from device_control.base import MotionDevice
+from device_control.scheduler import Priority, with_priority
 
 __all__ = ["CONEXDevice", "ConexAGAPButOnlyOneAxis"]
 
@@ -82,21 +83,24 @@ class CONEXDevice(MotionDevice):
         # pad command with CRLF ending
         cmd = f"{self.device_address}{command}\r\n"
         self.logger.debug(f"sending command: {cmd[:-2]}")
-        with self.serial as serial:
+        with self.port_scheduler.transaction(owner=self.device_address), self.serial as serial:
             # opens
             serial.write(cmd.encode())
             serial.read_until(b"\r\n")
         # closes
-        
+
 
     # @autoretry(max_retries=10)
     def ask_command(self, command: str):
         # pad command with CRLF ending
         cmd = f"{self.device_address}{command}\r\n"
         self.logger.debug(f"sending command: {cmd[:-2]}")
-        with self.serial as serial:
+        with self.port_scheduler.transaction(owner=self.device_address), self.serial as serial:
             serial.write(cmd.encode())
             resp = serial.read_until(b"\r\n")
+        return self.parse_reply(command, resp)
+
+    def parse_reply(self, command: str, resp: bytes) -> str:
         retval = resp.strip().decode()
         self.logger.debug(f"received: {retval[:-2]}")
         # strip command and \r\n from string
@@ -211,6 +215,7 @@ class CONEXDevice(MotionDevice):
     def _get_position(self) -> float:
         return float(self.ask_command("TP"))
 
+    @with_priority(Priority.STOP)
     def stop(self):
         self.send_command("ST")
         self.update_keys()
@@ -269,6 +274,7 @@ class ConexAGAPButOnlyOneAxis(CONEXDevice):
         while self.is_moving():
             self.update_keys()
 
+    @with_priority(Priority.STOP)
     def stop(self):
         self.send_command(f"ST{self.axis}")
         self.update_keys()
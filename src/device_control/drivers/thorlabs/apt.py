@@ -0,0 +1,91 @@
+"""
+Minimal codec for the Thorlabs APT binary protocol.
+
+Every message starts with a 6-byte header. Short messages carry two parameter bytes
+in it; if the high bit of the destination byte is set, the header instead gives the
+length of a data packet which follows. All values are little-endian.
+"""
+
+import struct
+from typing import NamedTuple
+
+__all__ = ["Message", "encode", "read_message", "request", "unpack_status_bits"]
+
+# message IDs
+MGMSG_MOT_MOVE_COMPLETED = 0x0464
+MGMSG_MOT_MOVE_JOG = 0x046A
+MGMSG_MOT_REQ_STATUSBITS = 0x0429
+MGMSG_MOT_GET_STATUSBITS = 0x042A
+
+# source/destination addresses
+HOST = 0x01
+GENERIC_USB = 0x50
+BAY_1 = 0x21
+DATA_FOLLOWS = 0x80
+
+# jog directions
+FORWARD = 0x01
+REVERSE = 0x02
+
+# status bits
+STATUS_FORWARD_LIMIT = 0x01
+STATUS_REVERSE_LIMIT = 0x02
+STATUS_MOVING = 0x10 | 0x20 | 0x40 | 0x80  # moving or jogging, either direction
+
+HEADER = struct.Struct("<HBBBB")  # id, param1, param2, dest, source
+DATA_HEADER = struct.Struct("<HHBB")  # id, data length, dest, source
+STATUS_BITS = struct.Struct("<HI")  # channel, status bits
+
+
+class Message(NamedTuple):
+    msg_id: int
+    param1: int
+    param2: int
+    dest: int
+    source: int
+    data: memoryview | None = None
+
+
+def encode(msg_id, param1=0, param2=0, dest=BAY_1, source=HOST, data=None) -> bytes:
+    if data is None:
+        return HEADER.pack(msg_id, param1, param2, dest, source)
+    return DATA_HEADER.pack(msg_id, len(data), dest | DATA_FOLLOWS, source) + bytes(data)
+
+
+def read_message(serial) -> Message:
+    """Read one message from the port, raising TimeoutError if it is incomplete"""
+    header = serial.read(HEADER.size)
+    if len(header) < HEADER.size:
+        msg = f"APT header incomplete, got {header!r}"
+        raise TimeoutError(msg)
+    msg_id, param1, param2, dest, source = HEADER.unpack_from(header)
+    if not dest & DATA_FOLLOWS:
+        return Message(msg_id, param1, param2, dest, source)
+    length = param1 | (param2 << 8)
+    buffer = bytearray(length)
+    view = memoryview(buffer)
+    nread = serial.readinto(view)
+    if nread < length:
+        msg = f"APT message {msg_id:#06x} truncated, got {nread} of {length} bytes"
+        raise TimeoutError(msg)
+    return Message(msg_id, 0, 0, dest & ~DATA_FOLLOWS, source, view)
+
+
+def request(serial, message: bytes, reply_id: int, max_messages=16) -> Message:
+    """
+    Send a request and return its reply, skipping unsolicited messages (e.g. move
+    completed notices) that arrive first.
+    """
+    serial.reset_input_buffer()
+    serial.write(message)
+    for _ in range(max_messages):
+        reply = read_message(serial)
+        if reply.msg_id == reply_id:
+            return reply
+    msg = f"no APT reply {reply_id:#06x} within {max_messages} messages"
+    raise TimeoutError(msg)
+
+
+def unpack_status_bits(data: memoryview) -> int:
+    _, bits = STATUS_BITS.unpack_from(data)
+    return bits
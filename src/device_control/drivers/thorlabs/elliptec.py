@@ -1,6 +1,9 @@
+import threading
 import time
 import elliptec
+from zaber_motion.exceptions import ConnectionFailedException
 from device_control.base import ConfigurableDevice
+from device_control.scheduler import Priority, with_priority
 
 from swmain.autoretry import autoretry
 
@@ -9,21 +12,86 @@ Please refer to this github repo for the detailed information about the Elliptec
 https://github.com/roesel/elliptec
 '''
 
+# GS status codes
+STATUS_OK = "0"
+STATUS_BUSY = "9"
+
+# stage class and the unit its position methods are named after (e.g. `set_angle`)
+DEVICE_TYPES = {
+    "Rotator": (elliptec.Rotator, "angle"),
+    "Shutter": (elliptec.Shutter, "slot"),
+    "Slider": (elliptec.Slider, "slot"),
+    "Linear": (elliptec.Linear, "distance"),
+}
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+
+def _is_open(controller):
+    # the controller swallows the error of a port which failed to open, and has no `s`
+    return hasattr(controller, "s") and controller.s.is_open
+
+
+def get_controller(port) -> elliptec.Controller:
+    """Get the controller (interface board) on `port`, shared by every device on its bus"""
+    with _controllers_lock:
+        controller = _controllers.get(port)
+        if controller is None or not _is_open(controller):
+            controller = elliptec.Controller(port, debug=False)
+            if not _is_open(controller):
+                _controllers.pop(port, None)
+                msg = f"Could not open Elliptec controller on {port}"
+                raise ConnectionFailedException(msg)
+            _controllers[port] = controller
+        return controller
+
+
+def invalidate_controller(port):
+    """Close and forget the controller on `port`, so the next stage reopens the port"""
+    with _controllers_lock:
+        controller = _controllers.pop(port, None)
+    if controller is not None and _is_open(controller):
+        controller.close_connection()
+
+
 class ThorlabsElliptec(ConfigurableDevice):
+    """
+    Elliptec stage, driven through the `elliptec` package.
+
+    Moves and homes return as soon as the stage reports its final position, which it
+    sends when motion completes. While the stage is busy, its status is polled until
+    the position arrives or `move_timeout` expires.
+
+    Several stages can share one interface board: give each its bus ``address`` (0-F)
+    in the serial section of its configuration. Stages on the same port share one
+    controller, and each command, including a whole move, is a transaction on the
+    port's scheduler, so replies from one stage are never read by another.
+
+    The stage ``type`` is one of `DEVICE_TYPES`: positions are angles for rotators,
+    distances for linear stages, and slot numbers for sliders and shutters.
+    """
+
+    move_timeout = 10  # s
+
     def __init__(self, serial_kwargs, **kwargs):
         serial_kwargs = dict({"baudrate": 9600, "rtscts": True}, **serial_kwargs)
-        self.controller = elliptec.Controller(serial_kwargs['port'], debug=False)
-        if serial_kwargs['type'] == 'Rotator':
-            self.device = elliptec.Rotator(self.controller)
-        elif serial_kwargs['type'] == 'Shutter':
-            self.device = elliptec.Shutter(self.controller)
-        elif serial_kwargs['type'] == 'Slider':
-            self.device = elliptec.Slider(self.controller)
-        elif serial_kwargs['type'] == 'Linear':
-            self.device = elliptec.Linear(self.controller)
-        del[serial_kwargs['type']]
-        self.configurations = kwargs['configurations']
-        # super().__init__(serial_kwargs=serial_kwargs, **kwargs)
+        device_type = serial_kwargs.pop("type")
+        if device_type not in DEVICE_TYPES:
+            msg = f"Unknown Elliptec stage type '{device_type}'"
+            raise ValueError(msg)
+        self.address = str(serial_kwargs.pop("address", "0"))
+        super().__init__(serial_kwargs=serial_kwargs, **kwargs)
+        # the elliptec controller owns the port, the transport is never used
+        self.serial = None
+        self.controller = get_controller(self.serial_kwargs["port"])
+        device_cls, self.unit = DEVICE_TYPES[device_type]
+        with self.port_scheduler.transaction(owner=self.address):
+            self.device = device_cls(self.controller, address=self.address, debug=False)
+
+    def disconnect(self):
+        # the controller may be dead, every stage on the port will open a new one
+        invalidate_controller(self.serial_kwargs["port"])
 
     def update_keys(self, position=None):
         if position is None:
@@ -33,25 +101,68 @@ class ThorlabsElliptec(ConfigurableDevice):
     def _update_keys(self, position):
         raise NotImplementedError()
 
+    def _wait_for_motion(self, status, timeout=None):
+        """
+        Wait for the reply marking the end of a move, starting from the first reply to the
+        move command, and return the stage position from it.
+        """
+        if timeout is None:
+            timeout = self.move_timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            if isinstance(status, tuple):
+                code = status[1].upper()
+                if code in ("PO", "HO"):
+                    return self._extract_position(status)
+                if code == "GS" and status[2] not in (STATUS_OK, STATUS_BUSY):
+                    msg = f"Elliptec stage reported error code {status[2]}"
+                    raise RuntimeError(msg)
+            if time.monotonic() > deadline:
+                msg = f"Elliptec move did not complete within {timeout} s"
+                raise TimeoutError(msg)
+            if isinstance(status, tuple) and status[1].upper() == "GS" and status[2] == STATUS_OK:
+                # stage is idle but we missed its position
+                status = self.device.get("position")
+            elif status is None:
+                # no reply within the serial timeout, check whether it is still moving
+                status = self.device.get("status")
+            else:
+                # still moving, the final position is sent unprompted
+                status = self.controller.read_response()
+
+    def _extract_position(self, status):
+        return getattr(self.device, f"extract_{self.unit}_from_status")(status)
+
     # @autoretry
+    @with_priority(Priority.MOVE)
     def set_position(self, position: float):
-        device = self.device
-        device.set_angle(position)
-        time.sleep(1)
-        self.update_keys()
+        set_position = getattr(self.device, f"set_{self.unit}")
+        if self.unit == "slot":
+            position = int(position)
+        with self.port_scheduler.transaction(owner=self.address):
+            set_position(position)
+            result = self._wait_for_motion(self.controller.last_status)
+        self.update_keys(result)
+        return result
 
     # @autoretry
     def get_position(self):
-        device = self.device
-        result = device.get_angle()
-        time.sleep(0.1)
+        get_position = getattr(self.device, f"get_{self.unit}")
+        with self.port_scheduler.transaction(owner=self.address):
+            result = get_position()
         self.update_keys(result)
         return result
 
+    @with_priority(Priority.MOVE)
     def move_relative(self, value):
         device = self.device
-        device.shift_angle(value)
-        result = device.get_angle()
+        with self.port_scheduler.transaction(owner=self.address):
+            if self.unit == "slot":
+                # sliders and shutters only move to absolute slots
+                device.set_slot(device.get_slot() + int(value))
+            else:
+                getattr(device, f"shift_{self.unit}")(value)
+            result = self._wait_for_motion(self.controller.last_status)
         self.update_keys(result)
         return result
 
@@ -87,10 +198,11 @@ class ThorlabsElliptec(ConfigurableDevice):
         output = self.format_str.format(idx, config)
         return posn, output
 
+    @with_priority(Priority.MOVE)
     def home(self):
         device = self.device
-        print(device)
-        result = device.home()
-        time.sleep(1)        
+        with self.port_scheduler.transaction(owner=self.address):
+            device.home()
+            result = self._wait_for_motion(self.controller.last_status)
         self.update_keys(result)
         return result
@@ -1,38 +1,110 @@
+import threading
+import time
+
 from device_control.base import MotionDevice
+from device_control.drivers.thorlabs.prompt import PromptProtocol
+from device_control.scheduler import Priority, with_priority
 
 
 class ThorlabsWheel(MotionDevice):
+    """
+    Thorlabs FW102C/FW212C filter wheel.
+
+    Moves return once the wheel reports the requested slot, and return that slot.
+    Pass ``wait=False`` to `move_absolute` (or `move_configuration`) to move in the
+    background instead; `is_moving` and `wait_for_move` follow its progress, and
+    `wait_for_move` raises the error of a background move which failed.
+    """
+
+    # the prompt after pos= normally returns once the wheel has stopped
+    move_timeout = 10  # s
+    # arrival polling interval, doubled after each poll up to the maximum
+    poll_interval = 0.02  # s
+    max_poll_interval = 0.5  # s
+
     def __init__(self, serial_kwargs, **kwargs):
-        serial_kwargs = dict({"baudrate": 115200, "timeout": None}, **serial_kwargs)
+        serial_kwargs = dict({"baudrate": 115200, "timeout": 0.1}, **serial_kwargs)
         super().__init__(serial_kwargs=serial_kwargs, **kwargs)
-        self.max_filters = 6  # self.get_count()
+        self.protocol = PromptProtocol(self.serial)
+        self._max_filters = None
+        self._move_thread = None
+        self._move_error = None
+        self._move_lock = threading.Lock()
+
+    @property
+    def max_filters(self):
+        # number of slots, read from the wheel once
+        if self._max_filters is None:
+            self._max_filters = self.get_count()
+        return self._max_filters
 
     # @autoretry
-    def send_command(self, cmd: str):
-        with self.serial as serial:
-            serial.write(f"{cmd}\r".encode())
-            cmd_resp = serial.read_until(b"\r")
-            assert cmd_resp.strip().decode() == cmd
-            serial.read_until(b"> ")
+    def send_command(self, cmd: str, timeout=None):
+        with self.port_scheduler.transaction():
+            self.protocol.send(cmd, timeout=timeout)
 
     # @autoretry
     def ask_command(self, cmd: str):
-        with self.serial as serial:
-            serial.write(f"{cmd}\r".encode())
-            cmd_resp = serial.read_until(b"\r")
-            assert cmd_resp.strip().decode() == cmd
-            resp = serial.read_until(b"\r")
-            serial.read_until(b"> ")
-        return resp.strip().decode()
+        with self.port_scheduler.transaction():
+            return self.protocol.ask(cmd)
 
     def _get_position(self):
         return int(self.ask_command("pos?"))
 
+    @with_priority(Priority.MOVE)
+    def move_absolute(self, value, wait=True, **kwargs):
+        if wait:
+            return super().move_absolute(value, **kwargs)
+        with self._move_lock:
+            if self.is_moving():
+                msg = "filter wheel is already moving"
+                raise RuntimeError(msg)
+            self._move_error = None
+            self._move_thread = threading.Thread(
+                target=self._background_move, args=(value,), kwargs=kwargs, daemon=True
+            )
+            self._move_thread.start()
+        return None
+
+    def _background_move(self, value, **kwargs):
+        try:
+            self.move_absolute(value, **kwargs)
+        except Exception as exc:
+            self.logger.error(f"background move to {value} failed: {exc!r}")
+            self._move_error = exc
+
+    def is_moving(self):
+        return self._move_thread is not None and self._move_thread.is_alive()
+
+    def wait_for_move(self, timeout=None):
+        """
+        Wait up to `timeout` seconds for a background move, returning whether it has
+        finished. Raises the error of the move if it failed.
+        """
+        if self._move_thread is not None:
+            self._move_thread.join(timeout)
+        if self.is_moving():
+            return False
+        error, self._move_error = self._move_error, None
+        if error is not None:
+            raise error
+        return True
+
     def _move_absolute(self, value):
+        value = int(value)
         if value < 1 or value > self.max_filters:
             msg = f"Filter position must be between 1 and {self.max_filters}"
             raise ValueError(msg)
-        self.send_command(f"pos={value}")
+        deadline = time.monotonic() + self.move_timeout
+        self.send_command(f"pos={value}", timeout=self.move_timeout)
+        interval = self.poll_interval
+        while (position := self._get_position()) != value:
+            if time.monotonic() > deadline:
+                msg = f"filter wheel reported slot {position} instead of {value}"
+                raise TimeoutError(msg)
+            time.sleep(interval)
+            interval = min(interval * 2, self.max_poll_interval)
+        return position + self.offset
 
     def get_status(self):
         posn = self.get_position()
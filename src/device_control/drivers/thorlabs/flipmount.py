@@ -1,21 +1,26 @@
 import time
 
 from device_control.base import ConfigurableDevice
+from device_control.drivers.thorlabs import apt
+from device_control.scheduler import Priority, with_priority
 
-# Raw byte commands for "MGMSG_MOT_MOVE_JOG"
-COMMANDS = {
-    "up": b"\x6A\x04\x00\x01\x21\x01",
-    "down": b"\x6A\x04\x00\x02\x21\x01",
-    "status": b"\x29\x04\x00\x00\x21\x01",
-}
+DIRECTIONS = {"up": apt.FORWARD, "down": apt.REVERSE}
 
-STATUSES = {
-    "up": b"*\x04\x06\x00\x81P\x01\x00\x01\x00\x00\x90",
-    "down": b"*\x04\x06\x00\x81P\x01\x00\x02\x00\x00\x90",
-}
+REQ_STATUS = apt.encode(apt.MGMSG_MOT_REQ_STATUSBITS)
 
 
 class ThorlabsFlipMount(ConfigurableDevice):
+    """
+    Thorlabs MFF flip mount, spoken to in the APT protocol.
+
+    The port stays open between commands. A flip returns once the status bits report
+    the mount resting on the limit switch of the new position, or raises TimeoutError
+    after `move_timeout`.
+    """
+
+    move_timeout = 3  # s
+    poll_interval = 0.02  # s
+
     def __init__(self, serial_kwargs, **kwargs):
         serial_kwargs = dict({"baudrate": 115200, "rtscts": True}, **serial_kwargs)
         super().__init__(serial_kwargs=serial_kwargs, **kwargs)
@@ -28,32 +33,50 @@ class ThorlabsFlipMount(ConfigurableDevice):
     def _update_keys(self, position):
         raise NotImplementedError()
 
+    def _port(self):
+        if not self.serial.is_open:
+            self.serial.open()
+        return self.serial
+
+    def _read_status_bits(self):
+        with self.port_scheduler.transaction():
+            reply = apt.request(self._port(), REQ_STATUS, apt.MGMSG_MOT_GET_STATUSBITS)
+        return apt.unpack_status_bits(reply.data)
+
+    @staticmethod
+    def _position_from_bits(bits):
+        if bits & apt.STATUS_MOVING:
+            return "unknown"
+        if bits & apt.STATUS_FORWARD_LIMIT:
+            return "up"
+        if bits & apt.STATUS_REVERSE_LIMIT:
+            return "down"
+        return "unknown"
+
     # @autoretry
+    @with_priority(Priority.MOVE)
     def set_position(self, position: str):
-        if position.lower() == "down":
-            cmd = COMMANDS["down"]
-        elif position.lower() == "up":
-            cmd = COMMANDS["up"]
-        else:
+        position = position.lower()
+        if position not in DIRECTIONS:
             msg = f"Position should be either 'up' or 'down', got '{position}'"
             raise ValueError(msg)
 
-        with self.serial as serial:
-            serial.write(cmd)
-            time.sleep(1)
-        self.update_keys()
+        with self.port_scheduler.transaction():
+            self._port().write(apt.encode(apt.MGMSG_MOT_MOVE_JOG, param2=DIRECTIONS[position]))
+        deadline = time.monotonic() + self.move_timeout
+        while self._position_from_bits(self._read_status_bits()) != position:
+            if time.monotonic() > deadline:
+                msg = f"flip mount did not reach '{position}' within {self.move_timeout} s"
+                raise TimeoutError(msg)
+            time.sleep(self.poll_interval)
+        self.update_keys(position)
 
     # @autoretry
     def get_position(self):
-        with self.serial as serial:
-            serial.write(COMMANDS["status"])
-            time.sleep(0.1)
-            response = serial.read(12)
-        if response == STATUSES["down"]:
-            result = "down"
-        elif response == STATUSES["up"]:
-            result = "up"
-        else:
+        try:
+            result = self._position_from_bits(self._read_status_bits())
+        except TimeoutError:
+            self.logger.warning("no status reply from flip mount")
             result = "unknown"
         self.update_keys(result)
         return result
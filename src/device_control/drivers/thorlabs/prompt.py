@@ -0,0 +1,84 @@
+import time
+
+__all__ = ["PromptProtocol", "PromptProtocolError"]
+
+
+class PromptProtocolError(RuntimeError):
+    pass
+
+
+class PromptProtocol:
+    """
+    Command-line protocol of the Thorlabs FW102C wheels and TC200 controllers.
+
+    Each command is terminated by ``\\r``; the device echoes it, prints a reply line for
+    queries, and then a ``> `` prompt. The port is kept open, and replies are read
+    incrementally up to the prompt, giving up after `timeout` seconds or `max_reply`
+    bytes instead of blocking forever.
+
+    Several commands can be written in one burst with `exchange`. The device handles
+    them in order, so the replies are split back apart on the prompts.
+    """
+
+    TERMINATOR = b"\r"
+    PROMPT = b"> "
+
+    def __init__(self, serial, timeout=2, max_reply=4096):
+        self.serial = serial
+        self.timeout = timeout  # s
+        self.max_reply = max_reply
+        self._buffer = bytearray()
+
+    def _port(self):
+        if not self.serial.is_open:
+            self.serial.open()
+        return self.serial
+
+    def _read_block(self, deadline):
+        # read up to and including the next prompt, return what came before it
+        serial = self._port()
+        while True:
+            idx = self._buffer.find(self.PROMPT)
+            if idx >= 0:
+                block = bytes(self._buffer[:idx])
+                del self._buffer[: idx + len(self.PROMPT)]
+                return block
+            if len(self._buffer) > self.max_reply:
+                self._buffer.clear()
+                msg = f"no prompt within {self.max_reply} bytes"
+                raise PromptProtocolError(msg)
+            if time.monotonic() > deadline:
+                pending = bytes(self._buffer)
+                self._buffer.clear()
+                msg = f"timed out waiting for prompt, got {pending!r}"
+                raise TimeoutError(msg)
+            self._buffer += serial.read(max(serial.in_waiting, 1))
+
+    def _parse_block(self, command, block):
+        lines = [line.strip() for line in block.decode().split("\r")]
+        lines = [line for line in lines if len(line) > 0]
+        if len(lines) == 0 or lines[0] != command:
+            msg = f"expected echo of '{command}', got {block!r}"
+            raise PromptProtocolError(msg)
+        return "\n".join(lines[1:])
+
+    def exchange(self, commands, timeout=None):
+        """
+        Send the commands in one write and return the reply to each (an empty string
+        for commands without a reply).
+        """
+        if timeout is None:
+            timeout = self.timeout
+        serial = self._port()
+        # drop anything left from an interrupted exchange
+        self._buffer.clear()
+        serial.reset_input_buffer()
+        serial.write(b"".join(cmd.encode() + self.TERMINATOR for cmd in commands))
+        deadline = time.monotonic() + timeout
+        return [self._parse_block(cmd, self._read_block(deadline)) for cmd in commands]
+
+    def send(self, command, timeout=None):
+        self.exchange([command], timeout=timeout)
+
+    def ask(self, command, timeout=None):
+        return self.exchange([command], timeout=timeout)[0]
@@ -1,4 +1,11 @@
+import threading
+import time
+
+import numpy as np
+
 from device_control.base import ConfigurableDevice
+from device_control.drivers.thorlabs.prompt import PromptProtocol
+from device_control.scheduler import Priority, io_priority
 
 
 def parse_status(bytevalues):
@@ -18,29 +25,189 @@ def parse_status(bytevalues):
     return output
 
 
+class TemperatureMonitor:
+    """
+    Samples the actual and auxiliary temperatures of a `ThorlabsTC` at a fixed interval
+    into a ring buffer of the last `size` samples.
+
+    Each sample is passed to the controller's ``update_keys``. Queries run at POLL
+    priority, so they never delay commands from users.
+    """
+
+    def __init__(self, device, interval=1, size=3600):
+        self.device = device
+        self.interval = interval  # s
+        # columns: unix time, tact, taux
+        self._buffer = np.full((size, 3), np.nan)
+        self._count = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self.is_running():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="tc-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop.is_set():
+            t0 = time.monotonic()
+            try:
+                self.sample()
+            except Exception:
+                self.device.logger.exception("failed to sample temperature")
+            self._stop.wait(max(self.interval - (time.monotonic() - t0), 0))
+
+    def sample(self):
+        with io_priority(Priority.POLL):
+            temp, aux = self.device.ask_commands("tact?", "taux?")
+        tact = float(temp.split()[0])
+        taux = float(aux.split()[0])
+        with self._lock:
+            self._buffer[self._count % len(self._buffer)] = time.time(), tact, taux
+            self._count += 1
+        self.device.update_keys(tact)
+        return tact, taux
+
+    def get_samples(self, window=None):
+        """
+        Return the samples (unix time, tact, taux) of the last `window` seconds (default
+        all), oldest first, as an (N, 3) array.
+        """
+        with self._lock:
+            size = len(self._buffer)
+            if self._count <= size:
+                samples = self._buffer[: self._count].copy()
+            else:
+                samples = np.roll(self._buffer, -(self._count % size), axis=0)
+        if window is not None and len(samples) > 0:
+            samples = samples[samples[:, 0] >= samples[-1, 0] - window]
+        return samples
+
+    def get_stats(self, window=60):
+        """
+        Rolling statistics of the actual temperature over the last `window` seconds
+
+        Returns
+        -------
+        dict
+            ``n`` samples and their ``span`` (s), the ``mean`` (°C), the ``slope`` of a
+            linear fit (°C/s), and the ``rms`` scatter about the mean (°C)
+        """
+        samples = self.get_samples(window)
+        n = len(samples)
+        if n == 0:
+            return {"n": 0, "span": 0.0, "mean": np.nan, "slope": np.nan, "rms": np.nan}
+        t = samples[:, 0] - samples[0, 0]
+        temps = samples[:, 1]
+        mean = temps.mean()
+        slope = np.polyfit(t, temps, 1)[0] if n > 1 else 0.0
+        return {
+            "n": n,
+            "span": float(t[-1]),
+            "mean": float(mean),
+            "slope": float(slope),
+            "rms": float(np.sqrt(np.mean((temps - mean) ** 2))),
+        }
+
+
 class ThorlabsTC(ConfigurableDevice):
-    def __init__(self, serial_kwargs, temp, autoenable=True, **kwargs):
-        serial_kwargs = dict({"baudrate": 115200}, **serial_kwargs)
+    """
+    Thorlabs TC200 temperature controller.
+
+    Once `start_monitor` is called, the temperatures are sampled continuously in the
+    background (see `TemperatureMonitor`), which keeps `update_keys` current and lets
+    `wait_until_stable` return as soon as the temperature has settled. Only the daemon,
+    which owns the port, should run the monitor; it connects with `connect_monitored`.
+    """
+
+    def __init__(self, serial_kwargs, temp, autoenable=True, monitor_interval=1, **kwargs):
+        serial_kwargs = dict({"baudrate": 115200, "timeout": 0.1}, **serial_kwargs)
         super().__init__(serial_kwargs=serial_kwargs, **kwargs)
+        self.protocol = PromptProtocol(self.serial)
+        self.monitor = TemperatureMonitor(self, interval=monitor_interval)
         self.set_target(temp)
 
+    @classmethod
+    def connect_monitored(cls, monitor_interval=5, **kwargs):
+        """Connect locally and start sampling the temperature every `monitor_interval` s"""
+        device = cls.connect(local=True, **kwargs)
+        device.start_monitor(monitor_interval)
+        return device
+
+    def disconnect(self):
+        self.monitor.stop()
+        super().disconnect()
+
+    def update_keys(self, temperature=None):
+        pass
+
+    def start_monitor(self, interval=None):
+        if interval is not None:
+            self.monitor.interval = interval
+        self.monitor.start()
+
+    def stop_monitor(self):
+        self.monitor.stop()
+
+    def get_temp_stats(self, window=60):
+        return self.monitor.get_stats(window)
+
+    def wait_until_stable(self, tolerance=0.1, window=30, timeout=600):
+        """
+        Wait until the temperature has settled on the target: over the last `window`
+        seconds, the mean is within `tolerance` of the target, and both the scatter and
+        the drift across the window are below `tolerance` (°C).
+
+        Runs the monitor while waiting if it is not running already. Returns the
+        statistics of the settled window, or raises TimeoutError after `timeout` seconds.
+        """
+        started = not self.monitor.is_running()
+        self.monitor.start()
+        try:
+            target = self.get_target()
+            deadline = time.monotonic() + timeout
+            while True:
+                stats = self.monitor.get_stats(window)
+                settled = (
+                    stats["span"] >= window * 0.9
+                    and abs(stats["mean"] - target) <= tolerance
+                    and stats["rms"] <= tolerance
+                    and abs(stats["slope"]) * window <= tolerance
+                )
+                if settled:
+                    return stats
+                if time.monotonic() > deadline:
+                    msg = f"temperature did not settle on {target} °C within {timeout} s: {stats}"
+                    raise TimeoutError(msg)
+                time.sleep(self.monitor.interval)
+        finally:
+            if started:
+                self.monitor.stop()
+
     def send_command(self, cmd: str):
-        with self.serial as serial:
-            serial.write(f"{cmd}\r".encode())
-            # time.sleep(0.5)
-            cmd_resp = serial.read_until(b"\r")
-            assert cmd_resp.strip().decode() == cmd
-            serial.read_until(b"> ")
+        with self.port_scheduler.transaction():
+            self.protocol.send(cmd)
 
     def ask_command(self, cmd: str):
-        with self.serial as serial:
-            serial.write(f"{cmd}\r".encode())
-            # time.sleep(0.5)
-            cmd_resp = serial.read_until(b"\r")
-            assert cmd_resp.strip().decode() == cmd
-            resp = serial.read_until(b"\r")
-            serial.read_until(b"> ")
-        return resp.strip().decode()
+        with self.port_scheduler.transaction():
+            return self.protocol.ask(cmd)
+
+    def ask_commands(self, *cmds: str):
+        """Send several queries in one burst and return their replies"""
+        with self.port_scheduler.transaction():
+            return self.protocol.exchange(cmds)
 
     def get_target(self):
         result = self.ask_command("tset?")
@@ -58,11 +225,8 @@ class ThorlabsTC(ConfigurableDevice):
         return float(result.split()[0])
 
     def status(self):
-        with self.serial as serial:
-            serial.write(b"stat?\r")
-            serial.read_until(b"\r")
-            result = serial.read(2)
-        return parse_status(result)
+        result = self.ask_command("stat?")
+        return parse_status(result.split()[0])
 
     def get_id(self):
         return self.ask_command("*idn?")
@@ -78,9 +242,10 @@ class ThorlabsTC(ConfigurableDevice):
             self.send_command("ens")
 
     def get_status(self):
-        stat_dict = self.status()
+        stat, temp, target = self.ask_commands("stat?", "tact?", "tset?")
+        stat_dict = parse_status(stat.split()[0])
         enabled_str = "Enabled" if stat_dict["enabled"] else "Disabled"
-        flc_temp = self.get_temp()
-        targ_temp = self.get_target()
+        flc_temp = float(temp.split()[0])
+        targ_temp = float(target.split()[0])
         output = self.format_str.format(enabled_str, flc_temp, targ_temp)
         return flc_temp, output
@@ -2,6 +2,7 @@ from zaber_motion import Library, Units
 from zaber_motion.binary import BinarySettings, CommandCode, Connection, Device
 
 from device_control.base import MotionDevice
+from device_control.scheduler import Priority, with_priority
 
 __all__ = ["ZaberDevice"]
 
@@ -26,18 +27,31 @@ class ZaberDevice(MotionDevice):
         self.serial = None
         self.zab_unit = ZABER_UNITS[self.unit]
         self.delay = delay
+        # open port transactions, the scheduler only lets one thread in at a time
+        self._transactions = []
 
     def get_serial_kwargs(self):
         return {**self.serial_kwargs, "device_number": self.device_number}
 
     def __enter__(self) -> Device:
-        self.connection = Connection.open_serial_port(self.serial_kwargs["port"])
-        device = self.connection.get_device(self.device_number)
-        device.identify()
+        # devices on the same daisy chain share the port, so take turns with them
+        transaction = self.port_scheduler.transaction(owner=self.device_number)
+        transaction.__enter__()
+        self._transactions.append(transaction)
+        try:
+            self.connection = Connection.open_serial_port(self.serial_kwargs["port"])
+            device = self.connection.get_device(self.device_number)
+            device.identify()
+        except BaseException:
+            self._transactions.pop().__exit__(None, None, None)
+            raise
         return device
 
     def __exit__(self, *args):
-        self.connection.close()
+        try:
+            self.connection.close()
+        finally:
+            self._transactions.pop().__exit__(None, None, None)
 
     def _get_position(self):
         with self as dev:
@@ -74,6 +88,7 @@ class ZaberDevice(MotionDevice):
             posn = device.home()
             self.update_keys(posn)
 
+    @with_priority(Priority.STOP)
     def stop(self):
         with self as device:
             device.stop()
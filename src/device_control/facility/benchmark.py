@@ -0,0 +1,174 @@
+import threading
+import time
+
+import click
+import numpy as np
+
+from device_control.base import SSHDevice
+from device_control.facility.image_rotator import StatusSession
+from device_control.facility.simulator import FacilitySimulator
+from device_control.facility.wpu import WPU, WPU_HWP
+from device_control.ssh_pool import get_connection
+
+__all__ = ["run_benchmarks"]
+
+USER = "bench"
+
+
+def _timeit(func, n):
+    times = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+    return np.array(times)
+
+
+def _summary(name, times):
+    ms = np.asarray(times) * 1e3
+    return {
+        "name": name,
+        "n": len(ms),
+        "mean": ms.mean(),
+        "p50": np.percentile(ms, 50),
+        "p95": np.percentile(ms, 95),
+        "max": ms.max(),
+    }
+
+
+def _wait_until(func, timeout=30, interval=0.01):
+    t0 = time.monotonic()
+    while not func():
+        if time.monotonic() - t0 > timeout:
+            msg = "timed out waiting for simulated move"
+            raise TimeoutError(msg)
+        time.sleep(interval)
+
+
+def _throughput(func, clients, n):
+    # each client makes `n` calls with its own device, returns calls per second
+    barrier = threading.Barrier(clients + 1)
+
+    def worker(device):
+        barrier.wait()
+        for _ in range(n):
+            func(device)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    t0 = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return clients * n / (time.perf_counter() - t0)
+
+
+def run_benchmarks(sim: FacilitySimulator, n=50, clients=8):
+    """
+    Run the facility device benchmarks against a running simulator.
+
+    Returns
+    -------
+    latencies : list of dict
+        Latency statistics (ms) of each operation
+    throughput : dict
+        Calls per second with `clients` concurrent clients
+    reconnect : dict
+        Time (ms) of the first call after the server dropped every connection, and the
+        number of reconnections made by the shared connection
+    """
+    connection = get_connection(sim.host, user=USER, **sim.connect_kwargs)
+    imr = SSHDevice(sim.host, user=USER)
+    shell = StatusSession(connection)
+    hwp = WPU_HWP(connection=connection, publish=False)
+    wpu = WPU(connection=connection, publish=False)
+
+    # connect and open channels before timing
+    imr.ask_command("imr st")
+    shell.ask("imr st")
+    hwp.get_status(max_age=0)
+
+    latencies = [
+        _summary("SSHDevice exec 'imr st'", _timeit(lambda: imr.ask_command("imr st"), n)),
+        _summary("StatusSession 'imr st'", _timeit(lambda: shell.ask("imr st"), n)),
+        _summary("WPUDevice status", _timeit(lambda: hwp.get_status(max_age=0), n)),
+        _summary("WPUDevice status (cached)", _timeit(hwp.get_status, n)),
+        _summary("WPU status (5 stages)", _timeit(lambda: wpu.get_status(max_age=0), n)),
+    ]
+
+    # moves: from the command until the stage reports it arrived
+    def imr_move():
+        target = sim.imr.get_target() + 0.01
+        imr.send_command(f"imr ma {target}")
+        _wait_until(lambda: f"stage angle: {target:.4f}" in shell.ask("imr st"))
+
+    def hwp_move():
+        target = round(sim.wpu["hwp"].get_target() + 0.01, 2)
+        hwp.move_absolute(target)
+        _wait_until(lambda: hwp.get_status(max_age=0)["position"] == target)
+
+    latencies.append(_summary("SSHDevice 'imr ma' + arrival", _timeit(imr_move, max(n // 5, 1))))
+    latencies.append(_summary("WPUDevice move + arrival", _timeit(hwp_move, max(n // 5, 1))))
+
+    devices = [WPU_HWP(connection=connection, publish=False) for _ in range(clients)]
+    throughput = {
+        "clients": clients,
+        "SSHDevice exec": _throughput(lambda i: imr.ask_command("imr st"), clients, n),
+        "WPUDevice status": _throughput(lambda i: devices[i].get_status(max_age=0), clients, n),
+    }
+
+    reconnects = connection.reconnects
+    sim.drop_connections()
+    time.sleep(0.1)
+    t0 = time.perf_counter()
+    imr.ask_command("imr st")
+    reconnect = {
+        "first call (ms)": (time.perf_counter() - t0) * 1e3,
+        "reconnections": connection.reconnects - reconnects,
+    }
+    t0 = time.perf_counter()
+    hwp.get_status(max_age=0)
+    reconnect["WPUDevice first call (ms)"] = (time.perf_counter() - t0) * 1e3
+
+    shell.close()
+    return latencies, throughput, reconnect
+
+
+@click.command(
+    "facility_bench", help="Benchmark the facility devices against a local SSH simulator."
+)
+@click.option("-n", default=50, type=int, help="Number of calls per measurement")
+@click.option("-c", "--clients", default=8, type=int, help="Number of concurrent clients")
+@click.option("-l", "--latency", default=0.0, type=float, help="Simulated reply latency in s")
+@click.option("-j", "--jitter", default=0.0, type=float, help="Simulated latency jitter in s")
+@click.option(
+    "--close-after-reply", is_flag=True, help="Simulate a WPU server that hangs up after each reply"
+)
+def main(n, clients, latency, jitter, close_after_reply):
+    with FacilitySimulator(
+        latency=latency,
+        jitter=jitter,
+        imr_speed=100,
+        wpu_speed=100,
+        close_after_reply=close_after_reply,
+    ) as sim:
+        latencies, throughput, reconnect = run_benchmarks(sim, n=n, clients=clients)
+    click.echo(
+        f"{'operation':32s} {'n':>4s} {'mean':>8s} {'p50':>8s} {'p95':>8s} {'max':>8s}  [ms]"
+    )
+    for row in latencies:
+        click.echo(
+            f"{row['name']:32s} {row['n']:4d} {row['mean']:8.2f} {row['p50']:8.2f} "
+            f"{row['p95']:8.2f} {row['max']:8.2f}"
+        )
+    click.echo(f"throughput with {throughput.pop('clients')} clients:")
+    for name, rate in throughput.items():
+        click.echo(f"  {name:30s} {rate:8.1f} calls/s")
+    click.echo("after dropping all connections:")
+    for name, value in reconnect.items():
+        click.echo(f"  {name:30s} {value:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
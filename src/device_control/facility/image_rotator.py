@@ -1,35 +1,139 @@
 import logging
 import re
+import threading
+import time
 
 import click
 import rich
+from paramiko import SSHException
 from scxconf.pyrokeys import VCAM1, VCAM2
-from swmain.network.pyroclient import connect
 from swmain.redis import update_keys
 
 from device_control.base import SSHDevice
+from device_control.pyro_client import forget, get_proxy
 
 logger = logging.getLogger(__name__)
 
+# "key: value" lines of `imr st`
+STATUS_SEPARATOR = re.compile(r":\s+")
+# printed after each status so the end of the reply can be found in the shell stream
+SENTINEL = "__IMR_STATUS_END__"
+
+
+def parse_status(reply: str):
+    status_dict = {}
+    for line in reply.splitlines():
+        tokens = STATUS_SEPARATOR.split(line.strip(), maxsplit=1)
+        if len(tokens) != 2:
+            continue
+        key, value = tokens
+        try:
+            val = float(value)
+        except ValueError:
+            val = value
+        status_dict[key] = val
+    return status_dict
+
+
+class StatusSession:
+    """
+    Long-lived interactive shell on the rotator host for repeated ``imr st`` queries.
+
+    Each query is followed by an ``echo`` of `SENTINEL`, and the reply is read up to it.
+    The sentinel is split in the command line itself, so the terminal echo of the
+    command never matches it.
+    """
+
+    def __init__(self, connection, timeout=5):
+        self.connection = connection
+        self.timeout = timeout  # s
+        self._channel = None
+        self._buffer = ""
+        self._lock = threading.Lock()
+
+    def open(self):
+        # the shell holds one of the connection's session slots until closed
+        self.connection.acquire_session()
+        try:
+            self._channel = self.connection.get_client().invoke_shell(width=512)
+        except Exception:
+            self.connection.release_session()
+            raise
+        self._channel.settimeout(self.timeout)
+        self._buffer = ""
+        # flush the login banner and prompt
+        self._query("stty -echo; PS1=''")
+
+    def close(self):
+        if self._channel is not None:
+            self._channel.close()
+            self.connection.release_session()
+        self._channel = None
+
+    def _query(self, command):
+        half = len(SENTINEL) // 2
+        self._channel.sendall(f"{command}; echo '{SENTINEL[:half]}''{SENTINEL[half:]}'\n")
+        while SENTINEL not in self._buffer:
+            chunk = self._channel.recv(4096)
+            if len(chunk) == 0:
+                msg = "image rotator shell closed"
+                raise EOFError(msg)
+            self._buffer += chunk.decode(errors="replace")
+        reply, _, self._buffer = self._buffer.partition(SENTINEL)
+        self._buffer = self._buffer.lstrip("\r\n")
+        return reply
+
+    def ask(self, command):
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._channel is None or self._channel.closed:
+                        self.open()
+                    return self._query(command)
+                except (OSError, EOFError, SSHException):
+                    self.close()
+                    if attempt > 0:
+                        raise
+        return None
+
 
 class ImageRotator(SSHDevice):
+    """
+    Image rotator, controlled with ``imr`` commands on the AO188 host.
+
+    Status queries go through a persistent shell (see `StatusSession`) and the parsed
+    status is cached. `start_polling` keeps the cache fresh in a background thread and
+    pushes the rotator angles to Redis and the camera headers whenever they change.
+    """
+
     CONF = "facility/conf_image_rotator.toml"
 
     KEY_MAP = {"stage angle": "D_IMRANG", "stage angle (pupil, theoretical)": "D_IMRPAD"}
 
     CAMS_TO_CHECK = (VCAM1, VCAM2)
 
-    def get_status(self):
-        status = self.ask_command("imr st")
-        lines = status.splitlines()
-        status_dict = {}
-        for line in lines:
-            key, value = re.split(":\s+", line)
-            try:
-                val = float(value)
-            except ValueError:
-                val = value
-            status_dict[key] = val
+    def __init__(self, host, user=None, config_file=None, poll_interval=1, status_ttl=0.5):
+        super().__init__(host, user=user, config_file=config_file)
+        self.poll_interval = poll_interval  # s
+        self.status_ttl = status_ttl  # s
+        self.session = StatusSession(self.connection)
+        self._status = None
+        self._status_time = 0
+        self._published = None
+        self._poll_thread = None
+        self._poll_stop = threading.Event()
+
+    def get_status(self, max_age=None):
+        if max_age is None:
+            max_age = self.status_ttl
+        if self._status is not None and time.monotonic() - self._status_time < max_age:
+            return self._status
+        return self._read_status()
+
+    def _read_status(self):
+        status_dict = parse_status(self.session.ask("imr st"))
+        self._status = status_dict
+        self._status_time = time.monotonic()
         self.update_keys(status_dict)
         return status_dict
 
@@ -38,9 +142,11 @@ class ImageRotator(SSHDevice):
         return status["stage angle"]
 
     def move_absolute(self, value):
+        self._status = None
         self.send_command(f"imr ma {value}")
 
     def move_relative(self, value: float):
+        self._status = None
         self.send_command(f"imr mr {value}")
 
     def update_keys(self, status=None):
@@ -48,15 +154,49 @@ class ImageRotator(SSHDevice):
             status = self.get_status()
         # normalize status dict
         hdr_dict = {self.KEY_MAP[k]: v for k, v in status.items() if k in self.KEY_MAP}
+        if hdr_dict == self._published:
+            return
         update_keys(**hdr_dict)
         ## update cams
+        published = True
         for cam in self.CAMS_TO_CHECK:
             try:
-                cam_pyro = connect(cam)
+                cam_pyro = get_proxy(cam)
                 for key, value in hdr_dict.items():
                     cam_pyro.set_keyword(key, value)
             except Exception:
+                published = False
+                forget(cam)
                 logger.exception(f"Unable to push keywords to cam {cam}")
+        # retry on the next status if a camera missed the update
+        self._published = hdr_dict if published else None
+
+    def start_polling(self, interval=None):
+        if interval is not None:
+            self.poll_interval = interval
+        if self.is_polling():
+            return
+        self._poll_stop.clear()
+        self._poll_thread = threading.Thread(target=self._poll, name="imr-poll", daemon=True)
+        self._poll_thread.start()
+
+    def stop_polling(self):
+        self._poll_stop.set()
+        if self._poll_thread is not None:
+            self._poll_thread.join()
+        self._poll_thread = None
+
+    def is_polling(self):
+        return self._poll_thread is not None and self._poll_thread.is_alive()
+
+    def _poll(self):
+        while not self._poll_stop.is_set():
+            t0 = time.monotonic()
+            try:
+                self._read_status()
+            except Exception:
+                logger.exception("Failed to poll image rotator status")
+            self._poll_stop.wait(max(self.poll_interval - (time.monotonic() - t0), 0))
 
 
 @click.group("imr", help="Simple interface for interacting with the image rotator.")
@@ -78,5 +218,20 @@ def status(obj):
     rich.print(obj["imr"].get_status())
 
 
+@main.command("monitor", help="Poll the rotator and push its angles to the camera headers.")
+@click.option("-i", "--interval", default=1.0, type=float, help="Polling interval in s")
+@click.pass_obj
+def monitor(obj, interval):
+    imr = obj["imr"]
+    imr.start_polling(interval)
+    try:
+        while True:
+            time.sleep(interval)
+            status = imr.get_status(max_age=interval * 2)
+            click.echo(f"{status.get('stage angle')}")
+    except KeyboardInterrupt:
+        imr.stop_polling()
+
+
 if __name__ == "__main__":
     main()
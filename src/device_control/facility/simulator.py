@@ -0,0 +1,357 @@
+import random
+import re
+import shlex
+import socket
+import threading
+import time
+from logging import getLogger
+
+import paramiko
+
+__all__ = ["FacilitySimulator", "SimulatedAxis"]
+
+logger = getLogger(__name__)
+
+WPU_PORT = 18902
+# how the WPU server is reached from a shell on garde
+WPU_EXEC = re.compile(rf"echo\s+(?P<command>.+?)\s*\|\s*nc\s+\S+\s+{WPU_PORT}")
+
+
+class SimulatedAxis:
+    """Stage which moves in a straight line to its target at a fixed speed"""
+
+    def __init__(self, position=0.0, speed=1.0):
+        self.speed = speed
+        self._start = position
+        self._target = position
+        self._t0 = 0
+        self._lock = threading.Lock()
+
+    def _position(self, now):
+        dt = now - self._t0
+        distance = self._target - self._start
+        if abs(distance) <= self.speed * dt:
+            return self._target
+        return self._start + self.speed * dt * (1 if distance > 0 else -1)
+
+    def get_position(self):
+        with self._lock:
+            return self._position(time.monotonic())
+
+    def get_target(self):
+        return self._target
+
+    def is_moving(self):
+        return self.get_position() != self._target
+
+    def move(self, target):
+        with self._lock:
+            now = time.monotonic()
+            self._start = self._position(now)
+            self._target = target
+            self._t0 = now
+
+
+class _ServerHandler(paramiko.ServerInterface):
+    # accepts any credentials and records what each channel was opened for
+
+    def __init__(self):
+        self._requests = {}
+        self._cond = threading.Condition()
+
+    def _set_request(self, chanid, kind, arg=None):
+        with self._cond:
+            self._requests[chanid] = (kind, arg)
+            self._cond.notify_all()
+
+    def wait_request(self, chanid, timeout=5):
+        with self._cond:
+            self._cond.wait_for(lambda: chanid in self._requests, timeout)
+            return self._requests.pop(chanid, (None, None))
+
+    def get_allowed_auths(self, username):
+        return "password,publickey"
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_auth_publickey(self, username, key):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_direct_tcpip_request(self, chanid, origin, destination):
+        if destination[1] != WPU_PORT:
+            return paramiko.OPEN_FAILED_CONNECT_FAILED
+        self._set_request(chanid, "tcpip")
+        return paramiko.OPEN_SUCCEEDED
+
+    def check_channel_exec_request(self, channel, command):
+        self._set_request(channel.get_id(), "exec", command.decode())
+        return True
+
+    def check_channel_shell_request(self, channel):
+        self._set_request(channel.get_id(), "shell")
+        return True
+
+    def check_channel_pty_request(self, *args):
+        return True
+
+
+class FacilitySimulator:
+    """
+    Local SSH server standing in for the AO188 host (image rotator) and garde (WPU).
+
+    It accepts any user and password and understands
+
+    - ``imr st``, ``imr ma <angle>`` and ``imr mr <angle>``, through exec or an
+      interactive shell
+    - the WPU server protocol (``<stage> status``, ``<stage> move <value>``), through a
+      ``direct-tcpip`` channel to port 18902 or ``echo <command> | nc localhost 18902``
+
+    Stages move at `imr_speed` (deg/s) and `wpu_speed` (mm/s or deg/s), and every reply
+    is delayed by `latency` plus up to `jitter` seconds. These can be changed while the
+    server runs, and `drop_connections` kills every connection to exercise reconnects.
+
+    Examples
+    --------
+    >>> with FacilitySimulator(latency=0.01) as sim:
+    ...     conn = get_connection(sim.host, user="test", **sim.connect_kwargs)
+    ...     conn.exec_command("imr st")
+    """
+
+    WPU_STAGES = ("spp", "shw", "sqw", "hwp", "qwp")
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        latency=0.0,
+        jitter=0.0,
+        imr_speed=2.0,
+        wpu_speed=20.0,
+        close_after_reply=False,
+    ):
+        self.host = host
+        self.port = port
+        self.latency = latency  # s
+        self.jitter = jitter  # s
+        # the WPU server may hang up after each reply
+        self.close_after_reply = close_after_reply
+        self.imr = SimulatedAxis(speed=imr_speed)
+        self.wpu = {name: SimulatedAxis(speed=wpu_speed) for name in self.WPU_STAGES}
+        self.connections = 0
+        self.commands = 0
+        self._host_key = paramiko.ECDSAKey.generate()
+        self._socket = None
+        self._transports = []
+        self._stop = threading.Event()
+
+    @property
+    def connect_kwargs(self):
+        """Keyword arguments for `get_connection` to reach this server"""
+        return {
+            "port": self.port,
+            "password": "simulator",
+            "look_for_keys": False,
+            "allow_agent": False,
+        }
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((self.host, self.port))
+        self.port = self._socket.getsockname()[1]
+        self._socket.listen(16)
+        self._socket.settimeout(0.2)
+        self._stop.clear()
+        threading.Thread(target=self._accept_loop, name="sim-accept", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        self.drop_connections()
+        if self._socket is not None:
+            self._socket.close()
+        self._socket = None
+
+    def drop_connections(self):
+        transports, self._transports = self._transports, []
+        for transport in transports:
+            transport.close()
+
+    def _delay(self):
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                sock, _ = self._socket.accept()
+            except (TimeoutError, OSError):
+                continue
+            self.connections += 1
+            threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+
+    def _serve(self, sock):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        transport = paramiko.Transport(sock)
+        transport.add_server_key(self._host_key)
+        handler = _ServerHandler()
+        try:
+            transport.start_server(server=handler)
+        except (paramiko.SSHException, EOFError):
+            return
+        self._transports.append(transport)
+        while transport.is_active() and not self._stop.is_set():
+            channel = transport.accept(timeout=0.2)
+            if channel is None:
+                continue
+            threading.Thread(
+                target=self._serve_channel, args=(handler, channel), daemon=True
+            ).start()
+
+    def _serve_channel(self, handler, channel):
+        kind, arg = handler.wait_request(channel.get_id())
+        try:
+            if kind == "tcpip":
+                self._serve_wpu(channel)
+            elif kind == "exec":
+                self._serve_exec(channel, arg)
+            elif kind == "shell":
+                self._serve_shell(channel)
+        except (OSError, EOFError, paramiko.SSHException):
+            pass
+        finally:
+            channel.close()
+
+    def _read_lines(self, channel, echo=None):
+        # yield complete lines from the channel, optionally echoing like a terminal
+        buffer = ""
+        while True:
+            data = channel.recv(4096)
+            if len(data) == 0:
+                return
+            buffer += data.decode()
+            while True:
+                idx = min((buffer.find(c) for c in "\r\n" if c in buffer), default=-1)
+                if idx < 0:
+                    break
+                line, buffer = buffer[:idx], buffer[idx + 1 :].lstrip("\n")
+                if echo is not None and echo():
+                    channel.sendall(f"{line}\r\n")
+                yield line
+
+    def _serve_wpu(self, channel):
+        for line in self._read_lines(channel):
+            reply = self.wpu_command(line)
+            self._delay()
+            if reply:
+                channel.sendall(reply)
+                if self.close_after_reply:
+                    return
+
+    def _serve_exec(self, channel, command):
+        match = WPU_EXEC.fullmatch(command.strip())
+        if match:
+            tokens = shlex.split(match["command"])
+            output = self.wpu_command(" ".join(tokens))
+            status = 0
+        elif command.startswith("imr"):
+            output, status = self.imr_command(shlex.split(command)[1:])
+        else:
+            output, status = f"{command.split()[0]}: command not found\n", 127
+        self._delay()
+        channel.sendall(output)
+        channel.send_exit_status(status)
+
+    def _serve_shell(self, channel):
+        state = {"echo": True, "prompt": "$ "}
+        channel.sendall("Facility simulator\r\n" + state["prompt"])
+        for line in self._read_lines(channel, echo=lambda: state["echo"]):
+            for command in line.split(";"):
+                tokens = shlex.split(command)
+                if len(tokens) == 0:
+                    continue
+                if tokens[0] == "exit":
+                    return
+                output = self._shell_command(tokens, state)
+                channel.sendall(output.replace("\n", "\r\n"))
+            channel.sendall(state["prompt"])
+
+    def _shell_command(self, tokens, state):
+        if tokens[0] == "stty":
+            if "-echo" in tokens:
+                state["echo"] = False
+            elif "echo" in tokens:
+                state["echo"] = True
+            return ""
+        if tokens[0].startswith("PS1="):
+            state["prompt"] = tokens[0].removeprefix("PS1=")
+            return ""
+        if tokens[0] == "echo":
+            return " ".join(tokens[1:]) + "\n"
+        if tokens[0] == "imr":
+            output, _ = self.imr_command(tokens[1:])
+            self._delay()
+            return output
+        return f"{tokens[0]}: command not found\n"
+
+    def imr_command(self, args):
+        """Run an ``imr`` command, returning its output and exit status"""
+        self.commands += 1
+        if args == ["st"]:
+            angle = self.imr.get_position()
+            state = "MOVING" if self.imr.is_moving() else "STOPPED"
+            output = (
+                f"stage angle: {angle:.4f}\n"
+                f"stage angle (pupil, theoretical): {(2 * angle) % 360:.4f}\n"
+                f"target angle: {self.imr.get_target():.4f}\n"
+                f"status: {state}\n"
+            )
+            return output, 0
+        try:
+            if args[0] == "ma":
+                self.imr.move(float(args[1]))
+                return "", 0
+            if args[0] == "mr":
+                self.imr.move(self.imr.get_target() + float(args[1]))
+                return "", 0
+        except (IndexError, ValueError):
+            pass
+        return "usage: imr st | imr ma <angle> | imr mr <angle>\n", 1
+
+    def wpu_command(self, line):
+        """Reply of the WPU server to one command line"""
+        self.commands += 1
+        tokens = line.split()
+        if len(tokens) < 2 or tokens[0] not in self.wpu:
+            return f"ERROR unknown command {line}\n"
+        name = tokens[0]
+        axis = self.wpu[name]
+        if tokens[1] == "status":
+            position = axis.get_position()
+            if axis.is_moving():
+                mode = "MOVING"
+            elif name in ("hwp", "qwp"):
+                mode = "FIXED"
+            else:
+                mode = "IN" if position > 1 else "OUT"
+            return (
+                f"{name} position {position:.3f} target {axis.get_target():.3f} "
+                f"mode {mode} pol_angle {(2 * position) % 180:.3f}\n"
+            )
+        if tokens[1] == "move" and len(tokens) == 3:
+            axis.move(float(tokens[2]))
+            return None
+        return f"ERROR unknown command {line}\n"
@@ -1,64 +1,205 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import click
-from paramiko import AutoAddPolicy, SSHClient
+from paramiko import SSHException
 from swmain.redis import update_keys
 
+from device_control.ssh_pool import SSHConnection, get_connection
+
 __all__ = ["WPU"]
 
+WPU_HOST = "garde.sum.naoj.org"
+WPU_USER = "ircs"
+
+
+# type and default value of each field of a "<stage> status" reply
+STATUS_FIELDS = {
+    "position": (float, -1),
+    "target": (float, -1),
+    "mode": (str, "UNKNOWN"),
+    "pol_angle": (float, -1),
+}
+
+
+def parse_status(reply: str, fields):
+    """
+    Parse a WPU status reply, which is a sequence of "<key> <value>" tokens, keeping the
+    given fields.
+    """
+    status = {field: STATUS_FIELDS[field][1] for field in fields}
+    tokens = reply.split()
+    for field in fields:
+        if field in tokens:
+            idx = tokens.index(field) + 1
+            status[field] = STATUS_FIELDS[field][0](tokens[idx])
+    return status
 
-class WPUDevice:
-    def __init__(self, client: SSHClient = None) -> None:
-        if client is None:
-            self.client = SSHClient()
-            self.client.set_missing_host_key_policy(AutoAddPolicy())
-            self.client.connect(
-                hostname="garde.sum.naoj.org",
-                username="ircs",
-                disabled_algorithms={"pubkeys": ["rsa-sha2-256", "rsa-sha2-512"]},
-            )
-        else:
-            self.client = client
 
+def _connect_garde() -> SSHConnection:
+    return get_connection(
+        WPU_HOST, user=WPU_USER, disabled_algorithms={"pubkeys": ["rsa-sha2-256", "rsa-sha2-512"]}
+    )
+
+
+class WPUDevice:
+    """
+    Base class for the waveplate unit stages.
+
+    Commands go to the WPU server (port 18902 on garde) over a ``direct-tcpip`` channel
+    forwarded through the shared SSH connection to garde, which stays open between
+    commands. After the first reply, the device waits briefly to learn whether the
+    server hangs up after each reply; if so, every command gets a fresh channel, so
+    none is written to a channel the server already closed. If the SSH connection
+    drops, it is reopened on the next command.
+
+    Subclasses set the stage `NAME` and the `STATUS_FIELDS` of its status reply. The
+    parsed status is cached for `STATUS_TTL` seconds and dropped after any command. New
+    statuses are published to Redis unless `publish` is False.
+
+    The server answers every command, so the reply to a command whose result is not
+    used is still read (for up to `ACK_TIMEOUT` seconds) and discarded, rather than
+    being taken for the reply to the next command.
+    """
+
+    NAME = None
+    STATUS_FIELDS = ()
+    STATUS_TTL = 0.5  # s
+    # how long to wait after the first reply to see if the server hangs up
+    HANGUP_PROBE = 0.05  # s
+    # how long to wait for the reply to a command whose result is not used
+    ACK_TIMEOUT = 1  # s
+
+    def __init__(self, connection: SSHConnection = None, timeout=5, publish=True) -> None:
+        if connection is None:
+            connection = _connect_garde()
+        self.connection = connection
+        self.publish = publish
         self.port = 18902
+        self.timeout = timeout  # s
+        self._channel = None
+        self._server_hangs_up = None
+        self._lock = threading.Lock()
+        self._status = None
+        self._status_time = 0
+
+    def _open_channel(self):
+        self._channel = self.connection.open_channel(
+            "direct-tcpip", ("localhost", self.port), ("localhost", 0), timeout=self.timeout
+        )
+        self._channel.settimeout(self.timeout)
+
+    def _close_channel(self):
+        if self._channel is not None:
+            self._channel.close()
+        self._channel = None
+
+    def _get_channel(self):
+        channel = self._channel
+        if channel is None or channel.closed or channel.eof_received:
+            self._close_channel()
+            self._open_channel()
+        return self._channel
+
+    def _drain(self, channel):
+        # discard any reply to a previous command which nobody waited for
+        while channel.recv_ready():
+            channel.recv(4096)
+
+    def _read_reply(self, channel):
+        data = b""
+        while b"\n" not in data:
+            chunk = channel.recv(4096)
+            if len(chunk) == 0:
+                if len(data) == 0:
+                    msg = "WPU server closed the channel without a reply"
+                    raise EOFError(msg)
+                # server closed the channel, the reply is complete
+                self._server_hangs_up = True
+                break
+            data += chunk
+        if self._server_hangs_up is None:
+            self._probe_hangup(channel)
+        return data.decode()
+
+    def _discard_reply(self, channel):
+        channel.settimeout(self.ACK_TIMEOUT)
+        try:
+            self._read_reply(channel)
+        except (TimeoutError, EOFError):
+            # no reply in time (drained before the next command), or the server hung up
+            pass
+        finally:
+            channel.settimeout(self.timeout)
+
+    def _probe_hangup(self, channel):
+        channel.settimeout(self.HANGUP_PROBE)
+        try:
+            self._server_hangs_up = len(channel.recv(4096)) == 0
+        except TimeoutError:
+            self._server_hangs_up = False
+        finally:
+            channel.settimeout(self.timeout)
+
+    def _exchange(self, command: str, reply: bool):
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    channel = self._get_channel()
+                    self._drain(channel)
+                    channel.sendall(f"{command}\n".encode())
+                    if reply:
+                        result = self._read_reply(channel)
+                    else:
+                        result = None
+                        self._discard_reply(channel)
+                    if self._server_hangs_up:
+                        self._close_channel()
+                    return result
+                except (OSError, EOFError, SSHException):
+                    self._close_channel()
+                    if attempt > 0:
+                        raise
+        return None
 
     def send_command(self, command: str):
-        cmd = f"echo {command} | nc localhost {self.port}"
-        stdin, stdout, stderr = self.client.exec_command(cmd)
+        self._status = None
+        self._exchange(command, reply=False)
 
     def ask_command(self, command: str):
-        cmd = f"echo {command} | nc localhost {self.port}"
-        stdin, stdout, stderr = self.client.exec_command(cmd)
-        return stdout.read().decode()
-
-
-class WPU_SPP(WPUDevice):
-    def get_status(self):
-        status = self.ask_command("spp status")
-        status_dict = {"position": -1, "target": -1, "mode": "UNKNOWN", "pol_angle": -1}
-        if len(status) > 0:
-            tokens = status.split()
-            pos_idx = tokens.index("position") + 1
-            targ_idx = tokens.index("target") + 1
-            mode_idx = tokens.index("mode") + 1
-            polang_idx = tokens.index("pol_angle") + 1
-            status_dict.update(
-                {
-                    "position": float(tokens[pos_idx]),
-                    "target": float(tokens[targ_idx]),
-                    "mode": tokens[mode_idx],
-                    "pol_angle": float(tokens[polang_idx]),
-                }
-            )
-        self.update_keys(status_dict)
+        return self._exchange(command, reply=True)
+
+    def get_status(self, max_age=None):
+        if max_age is None:
+            max_age = self.STATUS_TTL
+        age = time.monotonic() - self._status_time
+        if self._status is not None and age < max_age:
+            return self._status
+        reply = self.ask_command(f"{self.NAME} status")
+        status_dict = parse_status(reply, self.STATUS_FIELDS)
+        self._status = status_dict
+        self._status_time = time.monotonic()
+        if self.publish:
+            self.update_keys(status_dict)
         return status_dict
 
     def update_keys(self, status=None):
-        # TODO
         pass
 
     def get_position(self):
         status = self.get_status()
         return status["position"]
 
+
+class WPU_SPP(WPUDevice):
+    NAME = "spp"
+    STATUS_FIELDS = ("position", "target", "mode", "pol_angle")
+
+    def update_keys(self, status=None):
+        # TODO
+        pass
+
     def move_in(self):
         self.send_command("spp move 55.2")
 
@@ -67,30 +208,8 @@ class WPU_SPP(WPUDevice):
 
 
 class WPU_SHW(WPUDevice):
-    def get_status(self):
-        status = self.ask_command("shw status")
-        status_dict = {"position": -1, "target": -1, "mode": "UNKNOWN"}
-        if len(status) > 0:
-            tokens = status.split()
-            pos_idx = tokens.index("position") + 1
-            targ_idx = tokens.index("target") + 1
-            mode_idx = tokens.index("mode") + 1
-            status_dict.update(
-                {
-                    "position": float(tokens[pos_idx]),
-                    "target": float(tokens[targ_idx]),
-                    "mode": tokens[mode_idx],
-                }
-            )
-        self.update_keys(status_dict)
-        return status_dict
-
-    def update_keys(self, status=None):
-        pass
-
-    def get_position(self):
-        status = self.get_status()
-        return status["position"]
+    NAME = "shw"
+    STATUS_FIELDS = ("position", "target", "mode")
 
     def move_absolute(self, value):
         self.send_command(f"shw move {value:.02f}")
@@ -103,30 +222,8 @@ class WPU_SHW(WPUDevice):
 
 
 class WPU_SQW(WPUDevice):
-    def get_status(self):
-        status = self.ask_command("sqw status")
-        status_dict = {"position": -1, "target": -1, "mode": "UNKNOWN"}
-        if len(status) > 0:
-            tokens = status.split()
-            pos_idx = tokens.index("position") + 1
-            targ_idx = tokens.index("target") + 1
-            mode_idx = tokens.index("mode") + 1
-            status_dict.update(
-                {
-                    "position": float(tokens[pos_idx]),
-                    "target": float(tokens[targ_idx]),
-                    "mode": tokens[mode_idx],
-                }
-            )
-        self.update_keys(status_dict)
-        return status_dict
-
-    def update_keys(self, status=None):
-        pass
-
-    def get_position(self):
-        status = self.get_status()
-        return status["position"]
+    NAME = "sqw"
+    STATUS_FIELDS = ("position", "target", "mode")
 
     def move_absolute(self, value):
         self.send_command(f"sqw move {value:.02f}")
@@ -139,25 +236,8 @@ class WPU_SQW(WPUDevice):
 
 
 class WPU_HWP(WPUDevice):
-    def get_status(self):
-        status = self.ask_command("hwp status")
-        status_dict = {"position": -1, "target": -1, "mode": "UNKNOWN", "pol_angle": -1}
-        if len(status) > 0:
-            tokens = status.split()
-            pos_idx = tokens.index("position") + 1
-            targ_idx = tokens.index("target") + 1
-            mode_idx = tokens.index("mode") + 1
-            polang_idx = tokens.index("pol_angle") + 1
-            status_dict.update(
-                {
-                    "position": float(tokens[pos_idx]),
-                    "target": float(tokens[targ_idx]),
-                    "mode": tokens[mode_idx],
-                    "pol_angle": float(tokens[polang_idx]),
-                }
-            )
-        self.update_keys(status_dict)
-        return status_dict
+    NAME = "hwp"
+    STATUS_FIELDS = ("position", "target", "mode", "pol_angle")
 
     def update_keys(self, status=None):
         if status is None:
@@ -169,10 +249,6 @@ class WPU_HWP(WPUDevice):
         }
         update_keys(**mapping)
 
-    def get_position(self):
-        status = self.get_status()
-        return status["position"]
-
     def get_pol_angle(self):
         status = self.get_status()
         return status["pol_angle"]
@@ -182,25 +258,8 @@ class WPU_HWP(WPUDevice):
 
 
 class WPU_QWP(WPUDevice):
-    def get_status(self):
-        status = self.ask_command("qwp status")
-        status_dict = {"position": -1, "target": -1, "mode": "UNKNOWN", "pol_angle": -1}
-        if len(status) > 0:
-            tokens = status.split()
-            pos_idx = tokens.index("position") + 1
-            targ_idx = tokens.index("target") + 1
-            mode_idx = tokens.index("mode") + 1
-            polang_idx = tokens.index("pol_angle") + 1
-            status_dict.update(
-                {
-                    "position": float(tokens[pos_idx]),
-                    "target": float(tokens[targ_idx]),
-                    "mode": tokens[mode_idx],
-                    "pol_angle": float(tokens[polang_idx]),
-                }
-            )
-        self.update_keys(status_dict)
-        return status_dict
+    NAME = "qwp"
+    STATUS_FIELDS = ("position", "target", "mode", "pol_angle")
 
     def update_keys(self, status=None):
         if status is None:
@@ -212,10 +271,6 @@ class WPU_QWP(WPUDevice):
         }
         update_keys(**mapping)
 
-    def get_position(self):
-        status = self.get_status()
-        return status["position"]
-
     def get_pol_angle(self):
         status = self.get_status()
         return status["pol_angle"]
@@ -225,32 +280,30 @@ class WPU_QWP(WPUDevice):
 
 
 class WPU:
-    def __init__(self, *args, **kwargs) -> None:
-        self.client = SSHClient()
-        self.client.set_missing_host_key_policy(AutoAddPolicy())
-        self.client.load_system_host_keys()
-        self.client.connect(
-            hostname="garde.sum.naoj.org",
-            username="ircs",
-            disabled_algorithms={"pubkeys": ["rsa-sha2-256", "rsa-sha2-512"]},
+    def __init__(self, connection: SSHConnection = None, publish=True) -> None:
+        if connection is None:
+            connection = _connect_garde()
+        self.connection = connection
+        self.spp = WPU_SPP(connection=connection, publish=publish)
+        self.shw = WPU_SHW(connection=connection, publish=publish)
+        self.sqw = WPU_SQW(connection=connection, publish=publish)
+        self.hwp = WPU_HWP(connection=connection, publish=publish)
+        self.qwp = WPU_QWP(connection=connection, publish=publish)
+        self.devices = (self.spp, self.shw, self.sqw, self.hwp, self.qwp)
+        self._executor = ThreadPoolExecutor(
+            max_workers=len(self.devices), thread_name_prefix="wpu-status"
+        )
+
+    def get_status(self, max_age=None):
+        # each stage has its own channel on the shared connection, so query all at once
+        spp_status, shw_status, sqw_status, hwp_status, qwp_status = self._executor.map(
+            lambda dev: dev.get_status(max_age=max_age), self.devices
         )
-        self.spp = WPU_SPP(client=self.client)
-        self.shw = WPU_SHW(client=self.client)
-        self.sqw = WPU_SQW(client=self.client)
-        self.hwp = WPU_HWP(client=self.client)
-        self.qwp = WPU_QWP(client=self.client)
-
-    def get_status(self):
-        spp_status = self.spp.get_status()
-        shw_status = self.shw.get_status()
-        sqw_status = self.sqw.get_status()
-        hwp_status = self.hwp.get_status()
-        qwp_status = self.qwp.get_status()
-        status = f"""{'Polarizer':9s}: {spp_status['mode']:12s} {{ {spp_status['position']:4.01f} mm }}
-{'HWP stage':9s}: {shw_status['mode']:12s} {{ {shw_status['position']:4.01f} mm }}
-{'QWP stage':9s}: {sqw_status['mode']:12s} {{ {sqw_status['position']:4.01f} mm }}
-{'HWP':9s}: {hwp_status['mode']:12s} {{ pol={hwp_status['pol_angle']:6.02f}° wheel={hwp_status['position']:6.02f}° }}
-{'QWP':9s}: {qwp_status['mode']:12s} {{ pol={qwp_status['pol_angle']:6.02f}° wheel={qwp_status['position']:6.02f}° }}"""
+        status = f"""{"Polarizer":9s}: {spp_status["mode"]:12s} {{ {spp_status["position"]:4.01f} mm }}
+{"HWP stage":9s}: {shw_status["mode"]:12s} {{ {shw_status["position"]:4.01f} mm }}
+{"QWP stage":9s}: {sqw_status["mode"]:12s} {{ {sqw_status["position"]:4.01f} mm }}
+{"HWP":9s}: {hwp_status["mode"]:12s} {{ pol={hwp_status["pol_angle"]:6.02f}° wheel={hwp_status["position"]:6.02f}° }}
+{"QWP":9s}: {qwp_status["mode"]:12s} {{ pol={qwp_status["pol_angle"]:6.02f}° wheel={qwp_status["position"]:6.02f}° }}"""
         return status
 
 
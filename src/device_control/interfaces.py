@@ -1,9 +1,15 @@
 import abc
+import socket
+import threading
+import time
+from collections.abc import Mapping
+from contextlib import contextmanager
 from dataclasses import dataclass, field
-from numbers import Number
+from numbers import Integral, Number
 from pathlib import Path
 from typing import Any, ClassVar, Literal, Optional
 
+import numpy as np
 import paramiko
 import serial
 import tomli
@@ -11,6 +17,476 @@ from loguru import logger
 from swmain import redis
 from swmain.network.pyroclient import connect
 
+from device_control.scheduler import PortScheduler
+from device_control.ssh_pool import get_connection
+
+
+class Transport(abc.ABC):
+    """
+    Byte stream to a device: a serial port, a TCP socket, a forwarded SSH channel or an
+    in-memory mock.
+
+    The methods follow pyserial (``write``, ``read``, ``read_until``, ``in_waiting``, ...),
+    so drivers written against `serial.Serial` run on any transport. The stream is opened
+    on first use and kept open; after an I/O error inside a transaction it is closed, and
+    the next transaction reopens it. Transactions (``with transport:``) go through the
+    port's `PortScheduler`, so users sharing the transport never interleave commands and
+    replies. Reads give up after `timeout` seconds and return what has arrived, like
+    pyserial.
+
+    Use `get_transport` to share one transport between every device on it.
+    """
+
+    # errors which close the stream
+    ERRORS = (OSError, EOFError)
+
+    def __init__(self, name=None, timeout=0.5):
+        self.name = name
+        self.timeout = timeout  # s
+        self.scheduler = PortScheduler() if name is None else PortScheduler.for_port(name)
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self.opens = 0
+        self.errors = 0
+        self._buffer = bytearray()
+        self._lock = threading.Lock()
+        # transactions entered with `with transport:`; only the holder appends
+        self._transactions = []
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.name})"
+
+    @property
+    @abc.abstractmethod
+    def is_open(self) -> bool:
+        pass
+
+    @abc.abstractmethod
+    def _open(self):
+        pass
+
+    @abc.abstractmethod
+    def _close(self):
+        pass
+
+    @abc.abstractmethod
+    def _send(self, data: bytes):
+        pass
+
+    @abc.abstractmethod
+    def _recv(self, size: int, timeout) -> bytes:
+        """Receive up to `size` bytes, waiting at most `timeout` s; b"" if none came"""
+
+    def open(self):
+        with self._lock:
+            if not self.is_open:
+                self._buffer.clear()
+                self._open()
+                self.opens += 1
+
+    def close(self):
+        with self._lock:
+            self._buffer.clear()
+            self._close()
+
+    @contextmanager
+    def transaction(self, owner=None, priority=None):
+        """Hold the port for one exchange, see `PortScheduler.transaction`"""
+        with self.scheduler.transaction(owner=owner, priority=priority):
+            try:
+                self.open()
+                yield self
+            except self.ERRORS:
+                self.errors += 1
+                self.close()
+                raise
+
+    def __enter__(self):
+        transaction = self.transaction()
+        transaction.__enter__()
+        self._transactions.append(transaction)
+        return self
+
+    def __exit__(self, *args):
+        return self._transactions.pop().__exit__(*args)
+
+    def _deadline(self):
+        return None if self.timeout is None else time.monotonic() + self.timeout
+
+    def _fill(self, deadline):
+        # receive whatever arrives before the deadline into the buffer
+        timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+        data = self._recv(4096, timeout)
+        self.bytes_read += len(data)
+        self._buffer += data
+        return len(data)
+
+    def _expired(self, deadline):
+        return deadline is not None and time.monotonic() >= deadline
+
+    def _take(self, size):
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    @property
+    def in_waiting(self) -> int:
+        self.open()
+        self._fill(time.monotonic())
+        return len(self._buffer)
+
+    def reset_input_buffer(self):
+        self.open()
+        self._buffer.clear()
+        while self._recv(4096, 0):
+            pass
+
+    def write(self, data) -> int:
+        self.open()
+        data = bytes(data)
+        self._send(data)
+        self.bytes_written += len(data)
+        return len(data)
+
+    def read(self, size=1) -> bytes:
+        self.open()
+        deadline = self._deadline()
+        while len(self._buffer) < size:
+            if not self._fill(deadline) and self._expired(deadline):
+                break
+        return self._take(size)
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def read_until(self, expected=b"\n", size=None) -> bytes:
+        self.open()
+        deadline = self._deadline()
+        start = 0
+        while True:
+            idx = self._buffer.find(expected, start)
+            if idx >= 0:
+                return self._take(idx + len(expected))
+            if size is not None and len(self._buffer) >= size:
+                return self._take(size)
+            start = max(len(self._buffer) - len(expected) + 1, 0)
+            if not self._fill(deadline) and self._expired(deadline):
+                return self._take(len(self._buffer))
+
+    def readline(self) -> bytes:
+        return self.read_until(b"\n")
+
+    def get_metrics(self):
+        """Scheduler statistics of the port plus the traffic through this transport"""
+        metrics = self.scheduler.get_metrics()
+        metrics.update(
+            transport=self.__class__.__name__,
+            bytes_written=self.bytes_written,
+            bytes_read=self.bytes_read,
+            opens=self.opens,
+            errors=self.errors,
+        )
+        return metrics
+
+
+class SerialTransport(Transport):
+    """Serial port; extra keyword arguments (baudrate, ...) go to `serial.Serial`"""
+
+    ERRORS = (OSError, EOFError, serial.SerialException)
+
+    def __init__(self, port=None, timeout=0.5, **serial_kwargs):
+        # not opened until first use
+        self._serial = serial.Serial(timeout=timeout, **serial_kwargs)
+        self.port = port
+        super().__init__(name=port, timeout=timeout)
+
+    @property
+    def timeout(self):
+        return self._serial.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self._serial.timeout = value
+
+    @property
+    def is_open(self):
+        return self._serial.is_open
+
+    def _open(self):
+        self._serial.port = self.port
+        self._serial.open()
+
+    def _close(self):
+        self._serial.close()
+
+    def _send(self, data):
+        self._serial.write(data)
+
+    def _recv(self, size, timeout):
+        # only used to drain the port, reads go straight to pyserial
+        return self._serial.read(min(size, self._serial.in_waiting))
+
+    # pyserial already buffers and times out, don't add another layer
+    @property
+    def in_waiting(self):
+        self.open()
+        return self._serial.in_waiting
+
+    def reset_input_buffer(self):
+        self.open()
+        self._serial.reset_input_buffer()
+
+    def read(self, size=1):
+        self.open()
+        data = self._serial.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def read_until(self, expected=b"\n", size=None):
+        self.open()
+        data = self._serial.read_until(expected, size)
+        self.bytes_read += len(data)
+        return data
+
+
+class TCPTransport(Transport):
+    """TCP socket, e.g. to a serial device server"""
+
+    def __init__(self, host, port, timeout=0.5, connect_timeout=5):
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout  # s
+        self._socket = None
+        super().__init__(name=f"tcp://{host}:{port}", timeout=timeout)
+
+    @property
+    def is_open(self):
+        return self._socket is not None
+
+    def _open(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+        # commands and replies are small, don't let Nagle's algorithm hold them back
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._socket = sock
+
+    def _close(self):
+        if self._socket is not None:
+            self._socket.close()
+        self._socket = None
+
+    def _send(self, data):
+        self._socket.sendall(data)
+
+    def _recv(self, size, timeout):
+        self._socket.settimeout(timeout)
+        try:
+            data = self._socket.recv(size)
+        except (TimeoutError, BlockingIOError):
+            return b""
+        if len(data) == 0:
+            msg = f"{self.name} closed by peer"
+            raise ConnectionResetError(msg)
+        return data
+
+
+class SSHChannelTransport(Transport):
+    """
+    TCP port reached through an SSH tunnel (a ``direct-tcpip`` channel) on `host`. The SSH
+    connection is shared with every other user of the host, see `device_control.ssh_pool`.
+    """
+
+    ERRORS = (OSError, EOFError, paramiko.SSHException)
+
+    def __init__(
+        self, host, dest_port, dest_host="localhost", user=None, timeout=0.5, **ssh_kwargs
+    ):
+        self.connection = get_connection(host, user=user, **ssh_kwargs)
+        self.dest_addr = (dest_host, dest_port)
+        self._channel = None
+        super().__init__(name=f"ssh://{host}/{dest_host}:{dest_port}", timeout=timeout)
+
+    @property
+    def is_open(self):
+        return self._channel is not None and not self._channel.closed
+
+    def _open(self):
+        self._channel = self.connection.open_channel(
+            "direct-tcpip", self.dest_addr, ("127.0.0.1", 0), timeout=5
+        )
+
+    def _close(self):
+        if self._channel is not None:
+            self._channel.close()
+        self._channel = None
+
+    def _send(self, data):
+        self._channel.sendall(data)
+
+    def _recv(self, size, timeout):
+        self._channel.settimeout(timeout)
+        try:
+            data = self._channel.recv(size)
+        except TimeoutError:
+            return b""
+        if len(data) == 0:
+            msg = f"{self.name} closed by server"
+            raise EOFError(msg)
+        return data
+
+
+class MockTransport(Transport):
+    """
+    In-memory transport for testing drivers without hardware. Each write is passed to
+    `responder`, and the bytes it returns (if any) become readable; `feed` adds
+    unsolicited bytes. Everything written is kept in `written`.
+    """
+
+    def __init__(self, responder=None, name=None, timeout=0.5):
+        self.responder = responder
+        self.written = []
+        self._open_flag = False
+        self._pending = bytearray()
+        self._cond = threading.Condition()
+        super().__init__(name=name, timeout=timeout)
+
+    @property
+    def is_open(self):
+        return self._open_flag
+
+    def _open(self):
+        self._open_flag = True
+
+    def _close(self):
+        self._open_flag = False
+
+    def feed(self, data: bytes):
+        with self._cond:
+            self._pending += data
+            self._cond.notify_all()
+
+    def _send(self, data):
+        self.written.append(data)
+        if self.responder is not None:
+            reply = self.responder(data)
+            if reply:
+                self.feed(reply)
+
+    def _recv(self, size, timeout):
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._pending) > 0, timeout)
+            data = bytes(self._pending[:size])
+            del self._pending[:size]
+            return data
+
+
+TRANSPORTS = {
+    "serial": SerialTransport,
+    "tcp": TCPTransport,
+    "ssh": SSHChannelTransport,
+    "mock": MockTransport,
+}
+
+# keyword arguments which identify a shared transport of each kind
+TRANSPORT_ADDRESS = {
+    "serial": ("port",),
+    "tcp": ("host", "port"),
+    "ssh": ("host", "dest_port", "dest_host"),
+}
+
+# line settings the drivers give for serial ports; other transports ignore them (a
+# serial device server is configured on its own)
+SERIAL_SETTINGS = (
+    "baudrate",
+    "bytesize",
+    "parity",
+    "stopbits",
+    "xonxoff",
+    "rtscts",
+    "dsrdtr",
+    "write_timeout",
+    "inter_byte_timeout",
+    "exclusive",
+)
+
+# configuration key -> transport argument, for each kind
+TRANSPORT_SETTINGS = {
+    "serial": {"port": "port", "timeout": "timeout", **{key: key for key in SERIAL_SETTINGS}},
+    "tcp": {
+        "host": "host",
+        "port": "port",
+        "timeout": "timeout",
+        "connect_timeout": "connect_timeout",
+    },
+    "ssh": {
+        "host": "host",
+        "port": "dest_port",
+        "dest_port": "dest_port",
+        "dest_host": "dest_host",
+        "user": "user",
+        "timeout": "timeout",
+    },
+    "mock": {"port": "name", "name": "name", "timeout": "timeout"},
+}
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(kind="serial", **kwargs) -> Transport:
+    """
+    Get the shared transport of the given kind ("serial", "tcp", "ssh" or "mock") at the
+    address given by the keyword arguments (e.g. ``port`` for a serial port, ``host`` and
+    ``port`` for TCP). The other arguments are passed to the transport class and only
+    take effect for the first caller. Serial ports without a port, and mocks, are never
+    shared.
+
+    Examples
+    --------
+    >>> get_transport(port="/dev/ttyUSB0", baudrate=115200)
+    >>> get_transport("tcp", host="moxa", port=4001)
+    """
+    cls = TRANSPORTS[kind]
+    address = tuple(kwargs.get(key) for key in TRANSPORT_ADDRESS.get(kind, ()))
+    if len(address) == 0 or address[0] is None:
+        return cls(**kwargs)
+    key = (kind, *address)
+    with _transports_lock:
+        if key not in _transports:
+            _transports[key] = cls(**kwargs)
+        return _transports[key]
+
+
+def transport_from_kwargs(kwargs: dict[str, Any]) -> Transport:
+    """
+    Get the transport described by a device's serial configuration. The optional
+    ``transport`` key selects the kind, and defaults to a serial port. The keys are
+    mapped to the transport's arguments with `TRANSPORT_SETTINGS` (e.g. ``port`` is the
+    name of a mock), and serial line settings are dropped for the other kinds.
+
+    Raises
+    ------
+    ValueError
+        If the kind is unknown, or a key means nothing to it.
+    """
+    kwargs = dict(kwargs)
+    kind = kwargs.pop("transport", "serial")
+    if kind not in TRANSPORT_SETTINGS:
+        msg = f"Unknown transport '{kind}', expected one of {', '.join(TRANSPORT_SETTINGS)}"
+        raise ValueError(msg)
+    settings = TRANSPORT_SETTINGS[kind]
+    if kind != "serial":
+        kwargs = {k: v for k, v in kwargs.items() if k not in SERIAL_SETTINGS}
+    unknown = [key for key in kwargs if key not in settings]
+    if len(unknown) > 0:
+        msg = f"Unknown settings for a {kind} transport: {', '.join(unknown)}"
+        raise ValueError(msg)
+    return get_transport(kind, **{settings[key]: value for key, value in kwargs.items()})
+
+
+##################################################################################
+
 
 @dataclass
 class DeviceDriver(abc.ABC):
@@ -37,7 +513,7 @@ class SerialDriver(DeviceDriver):
     serial_kwargs: dict[str, Any] = field(default_factory=dict)
 
     def __post_init__(self):
-        self.serial = serial.Serial(self.address, **self.serial_kwargs)
+        self.serial = get_transport("serial", port=self.address, **self.serial_kwargs)
 
     @classmethod
     def from_dict(__cls__, config: dict[str, Any]):
@@ -65,10 +541,8 @@ class SSHDriver(DeviceDriver):
     ssh_kwargs: dict[str, Any] = field(default_factory=dict)
 
     def __post_init__(self):
-        self.ssh_client = paramiko.SSHClient()
-        self.ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        self.ssh_client.load_system_host_keys()
-        self.ssh_client.connect(self.host, username=self.user, **self.ssh_kwargs)
+        # shared with every other device on this host, see `device_control.ssh_pool`
+        self.connection = get_connection(self.host, user=self.user, **self.ssh_kwargs)
 
     @classmethod
     def from_dict(__cls__, config: dict[str, Any]):
@@ -82,14 +556,13 @@ class SSHDriver(DeviceDriver):
         return config_dict
 
     def send(self, command: str):
-        logger.debug(f"SSH command | {self.name} | {self.command}")
-        stdin, stdout, stderr = self.client.exec_command(command)
-        logger.debug(f"SSH reply | {self.name} | {stdout.read().decode()}")
+        logger.debug(f"SSH command | {self.name} | {command}")
+        reply = self.connection.exec_command(command)
+        logger.debug(f"SSH reply | {self.name} | {reply}")
 
     def ask(self, command: str):
-        logger.debug(f"SSH command | {self.name} | {self.command}")
-        stdin, stdout, stderr = self.client.exec_command(command)
-        reply = stdout.read().decode()
+        logger.debug(f"SSH command | {self.name} | {command}")
+        reply = self.connection.exec_command(command)
         logger.debug(f"SSH reply | {self.name} | {reply}")
         return reply
 
@@ -184,11 +657,269 @@ class RedisMixin:
         self.update_redis(params)
 
 
-@dataclass
 class Configuration:
-    index: int
-    name: str
-    values: dict[str, str | Number]
+    """
+    One saved configuration: its index, name and value (a number, or a mapping of axis
+    name to number for devices with several axes).
+
+    It can also be used like the dictionaries configurations are stored as, i.e.
+    ``row["idx"]``, ``row["name"]`` and ``row["value"]``. Changes are reflected in the
+    table holding it.
+    """
+
+    __slots__ = ("_index", "_name", "_table", "_value")
+
+    KEYS: ClassVar[dict[str, str]] = {
+        "idx": "index",
+        "index": "index",
+        "name": "name",
+        "value": "value",
+        "values": "value",
+    }
+
+    def __init__(self, index: int, name: str, value):
+        self._index = index
+        self._name = name
+        self._value = value
+        self._table = None
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._index}, {self._name!r}, {self._value!r})"
+
+    def _changed(self):
+        if self._table is not None:
+            self._table._invalidate()
+
+    @property
+    def index(self) -> int:
+        return self._index
+
+    @index.setter
+    def index(self, value: int):
+        self._index = value
+        self._changed()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @name.setter
+    def name(self, value: str):
+        self._name = value
+        self._changed()
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        if self._table is not None:
+            self._table._check(self._index, value)
+        self._value = value
+        self._changed()
+
+    def __getitem__(self, key):
+        return getattr(self, self.KEYS[key])
+
+    def __setitem__(self, key, value):
+        setattr(self, self.KEYS[key], value)
+
+    def __contains__(self, key):
+        return key in self.KEYS
+
+    def get(self, key, default=None):
+        return self[key] if key in self.KEYS else default
+
+    def to_dict(self) -> dict[str, Any]:
+        value = self._value
+        if isinstance(value, Mapping):
+            value = {axis: _plain(v) for axis, v in value.items()}
+        return {"idx": self._index, "name": self._name, "value": _plain(value)}
+
+
+def _plain(value):
+    # numpy scalars (e.g. positions) can't be written to TOML
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _as_float(value) -> float:
+    if isinstance(value, Number) and not isinstance(value, bool):
+        return float(value)
+    return np.nan
+
+
+class ConfigurationTable:
+    """
+    Saved configurations of a device, kept sorted by index.
+
+    Besides the `Configuration` records, the table keeps a contiguous float array of the
+    values of each axis, and hash maps from index and from (case-insensitive) name. So
+    `nearest`, which matches a position to a configuration, is a few vectorized
+    operations into preallocated buffers, and `lookup` is a dictionary access. Both are
+    called on every status poll. Non-numeric values (e.g. "up") can be stored and looked
+    up, but are never matched by `nearest`.
+
+    The table iterates like the list of dictionaries it replaces. `from_list` and
+    `to_list` convert to and from that list, as read from and written to TOML.
+
+    All access goes through one lock, so a configuration saved from one thread never
+    rebuilds the arrays under a status poll running in another.
+    """
+
+    def __init__(self, rows=(), axes=None):
+        # axis names of multi-axis values, or None for a single unnamed axis
+        self.axes = None if axes is None else tuple(axes)
+        self._rows = []
+        self._lock = threading.RLock()
+        for row in rows:
+            self._add(row)
+        self._invalidate()
+
+    @classmethod
+    def from_list(cls, rows) -> "ConfigurationTable":
+        if isinstance(rows, cls):
+            return rows
+        configs = []
+        for row in rows or []:
+            if not isinstance(row, Configuration):
+                row = Configuration(row["idx"], row["name"], row["value"])
+            configs.append(row)
+        axes = next((tuple(c.value) for c in configs if isinstance(c.value, Mapping)), None)
+        return cls(configs, axes=axes)
+
+    def to_list(self) -> list[dict[str, Any]]:
+        return [row.to_dict() for row in self]
+
+    def _check(self, index, value):
+        # multi-axis tables need a position for each axis
+        if self.axes is not None and not isinstance(value, Mapping):
+            msg = f"Configuration {index} needs a value for each of the axes {self.axes}"
+            raise ValueError(msg)
+        if self.axes is None and isinstance(value, Mapping) and len(self._rows) > 0:
+            msg = f"Configuration {index} has values for several axes, but the table has one"
+            raise ValueError(msg)
+
+    def _add(self, row: Configuration):
+        self._check(row.index, row.value)
+        if row._table is not None and row._table is not self:
+            row = Configuration(row.index, row.name, row.value)
+        row._table = self
+        self._rows.append(row)
+        return row
+
+    def _invalidate(self):
+        with self._lock:
+            self._values = None
+
+    def _ensure(self):
+        # rebuild the maps and arrays after a change, called with the lock held
+        if self._values is not None:
+            return
+        self._rows.sort(key=lambda r: r.index)
+        self._by_index = {row.index: row for row in self._rows}
+        self._by_name = {row.name.lower(): row for row in self._rows}
+        naxes = 1 if self.axes is None else len(self.axes)
+        values = np.empty((naxes, len(self._rows)))
+        for j, row in enumerate(self._rows):
+            if self.axes is None:
+                values[0, j] = _as_float(row.value)
+            else:
+                for i, axis in enumerate(self.axes):
+                    values[i, j] = _as_float(row.value.get(axis))
+        self._scratch = np.empty_like(values)
+        self._deviation = np.empty(len(self._rows))
+        self._values = values
+
+    def __len__(self):
+        with self._lock:
+            return len(self._rows)
+
+    def __iter__(self):
+        with self._lock:
+            self._ensure()
+            return iter(list(self._rows))
+
+    def __getitem__(self, i) -> Configuration:
+        with self._lock:
+            self._ensure()
+            return self._rows[i]
+
+    def __contains__(self, index):
+        with self._lock:
+            self._ensure()
+            return index in self._by_index
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.to_list()})"
+
+    def append(self, row):
+        """Add a configuration, given as a `Configuration` or a dictionary"""
+        if not isinstance(row, Configuration):
+            row = Configuration(row["idx"], row["name"], row["value"])
+        with self._lock:
+            if self.axes is None and isinstance(row.value, Mapping) and len(self._rows) == 0:
+                self.axes = tuple(row.value)
+            row = self._add(row)
+            self._invalidate()
+        return row
+
+    def get(self, index, default=None):
+        with self._lock:
+            self._ensure()
+            return self._by_index.get(index, default)
+
+    def by_index(self, index: int) -> Configuration:
+        with self._lock:
+            self._ensure()
+            row = self._by_index.get(index)
+        if row is None:
+            msg = f"No configuration saved at index {index}"
+            raise ValueError(msg)
+        return row
+
+    def by_name(self, name: str) -> Configuration:
+        with self._lock:
+            self._ensure()
+            row = self._by_name.get(name.lower())
+        if row is None:
+            msg = f"No configuration saved with name '{name}'"
+            raise ValueError(msg)
+        return row
+
+    def lookup(self, idx_or_name) -> Configuration:
+        """Find a configuration by index, or by name (strings of digits are indices)"""
+        if isinstance(idx_or_name, Integral) or idx_or_name.isdigit():
+            return self.by_index(int(idx_or_name))
+        return self.by_name(idx_or_name)
+
+    def nearest(self, position, tol=None) -> Configuration | None:
+        """
+        Return the configuration closest to `position`, or None if there is none within
+        `tol` (the largest deviation over the axes). For multi-axis tables, `position`
+        maps axis name to position, or is a sequence in `axes` order.
+        """
+        with self._lock:
+            self._ensure()
+            if len(self._rows) == 0:
+                return None
+            scratch = self._scratch
+            if self.axes is None:
+                np.subtract(self._values[0], position, out=scratch[0])
+            else:
+                by_name = isinstance(position, Mapping)
+                for i, axis in enumerate(self.axes):
+                    value = position[axis] if by_name else position[i]
+                    np.subtract(self._values[i], value, out=scratch[i])
+            np.abs(scratch, out=scratch)
+            deviation = self._deviation
+            np.max(scratch, axis=0, out=deviation)
+            # non-numeric values never match
+            np.nan_to_num(deviation, copy=False, nan=np.inf)
+            j = deviation.argmin()
+            if deviation[j] == np.inf or (tol is not None and deviation[j] > tol):
+                return None
+            return self._rows[j]
 
 
 ##################################################################################
@@ -199,6 +930,7 @@ class ConfigurableDevice(abc.ABC):
     name: str
     conf_path: Path
     drivers: dict[str, DeviceDriver] = field(default_factory=dict)
+    configurations: ConfigurationTable = field(default_factory=ConfigurationTable)
     computer: Optional[Literal["scexao2", "scexaoV"]] = None
 
     @classmethod
@@ -213,12 +945,9 @@ class ConfigurableDevice(abc.ABC):
                     driver = SSHDriver.from_dict(device)
             drivers[driver.name] = driver
 
-        configurations = []
-        for config in config_dict.pop("configurations", []):
-            configurations.append(Configuration(**config))
-        sorted_configurations = list(sorted(configurations, key=lambda c: c.index))
+        configurations = ConfigurationTable.from_list(config_dict.pop("configurations", []))
         kwds = {**config_dict, **kwargs}
-        return __cls__(name=name, drivers=drivers, configs=sorted_configurations, **kwds)
+        return __cls__(name=name, drivers=drivers, configurations=configurations, **kwds)
 
     @abc.abstractmethod
     def to_dict(self):
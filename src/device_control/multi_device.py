@@ -1,12 +1,13 @@
 from pathlib import Path
 
-import numpy as np
 import tomli
 import tomli_w
 
 from device_control.base import ConfigurableDevice
 from device_control.drivers.conex import CONEXDevice, ConexAGAPButOnlyOneAxis
 from device_control.drivers.zaber import ZaberDevice
+from device_control.interfaces import ConfigurationTable
+from device_control.scheduler import Priority, with_priority
 
 __all__ = ["MultiDevice"]
 
@@ -16,6 +17,7 @@ class MultiDevice(ConfigurableDevice):
         self.devices = devices
         kwargs["serial_kwargs"] = {}
         super().__init__(**kwargs)
+        self.configurations = ConfigurationTable.from_list(self.configurations)
 
     def get_devices(self):
         return self.devices
@@ -26,21 +28,25 @@ class MultiDevice(ConfigurableDevice):
     def get_position(self, name):
         return self.devices[name].get_position()
 
+    @with_priority(Priority.MOVE)
     def home(self, name, **kwargs):
         result = self.devices[name].home(**kwargs)
         self.update_keys()
         return result
 
+    @with_priority(Priority.MOVE)
     def move_absolute(self, name, value, **kwargs):
         result = self.devices[name].move_absolute(value, **kwargs)
         self.update_keys()
         return result
 
+    @with_priority(Priority.MOVE)
     def move_relative(self, name, value, **kwargs):
         result = self.devices[name].move_relative(value, **kwargs)
         self.update_keys()
         return result
 
+    @with_priority(Priority.STOP)
     def stop(self, name=None):
         if name is None:
             for device in self.devices.values():
@@ -81,7 +87,7 @@ class MultiDevice(ConfigurableDevice):
             filename = self.config_file
         path = Path(filename)
 
-        config = {"name": self.name, "configurations": self.configurations}
+        config = {"name": self.name, "configurations": self.get_configurations()}
         config.update(self._config_extras())
         config["devices"] = []
         for key, device in self.devices.items():
@@ -117,26 +123,19 @@ class MultiDevice(ConfigurableDevice):
                 name = current_config[1]
 
         # see if existing configuration
-        for row in self.configurations:
-            if row["idx"] == index:
-                if name is not None:
-                    row["name"] = name
-                row["value"] = dev_posns
-                self.logger.info(
-                    f"updated configuration {index} '{row['name']}' to value {row['value']}"
-                )
-                break
+        row = self.configurations.get(index)
+        if row is not None:
+            if name is not None:
+                row.name = name
+            row.value = dev_posns
+            self.logger.info(f"updated configuration {index} '{row.name}' to value {row.value}")
         else:
             if name is None:
                 msg = "Must provide name for new configuration"
                 raise ValueError(msg)
-            self.configurations.append(dict(idx=index, name=name, values=dev_posns.values()))
-            self.logger.info(
-                f"added new configuration {index} '{name}' with values {dev_posns.values()}"
-            )
+            self.configurations.append(dict(idx=index, name=name, value=dev_posns))
+            self.logger.info(f"added new configuration {index} '{name}' with values {dev_posns}")
 
-        # sort configurations dictionary in-place by index
-        self.configurations.sort(key=lambda d: d["idx"])
         # save configurations to file
         self.save_config(**kwargs)
         self.update_keys()
@@ -148,26 +147,14 @@ class MultiDevice(ConfigurableDevice):
         return self.move_configuration_name(idx_or_name, **kwargs)
 
     def move_configuration_idx(self, idx: int):
-        for row in self.configurations:
-            if row["idx"] == idx:
-                self.current_config = row["value"]
-                break
-        else:
-            msg = f"No configuration saved at index {idx}"
-            raise ValueError(msg)
+        self.current_config = self.configurations.by_index(idx).value
         for dev_name, value in self.current_config.items():
             # TODO async wait
             self.devices[dev_name].move_absolute(value)
             self.update_keys()
 
     def move_configuration_name(self, name: str):
-        for row in self.configurations:
-            if row["name"].lower() == name.lower():
-                self.current_config = row["value"]
-                break
-        else:
-            msg = f"No configuration saved with name '{name}'"
-            raise ValueError(msg)
+        self.current_config = self.configurations.by_name(name).value
         for dev_name, value in self.current_config.items():
             self.devices[dev_name].move_absolute(value)
             self.update_keys()
@@ -185,13 +172,13 @@ class MultiDevice(ConfigurableDevice):
             values = {k: p for k, p in zip(self.devices.keys(), positions)}
         else:
             values = {k: dev.get_position() for k, dev in self.devices.items()}
-        for row in self.configurations:
-            match = True
-            for key, val in values.items():
-                match = match and np.abs(row["value"][key] - val) <= tol
-            if match:
-                return row["idx"], row["name"]
-        return None, "Unknown"
+        row = self.configurations.nearest(values, tol=tol)
+        if row is None:
+            return None, "Unknown"
+        return row.index, row.name
+
+    def get_io_metrics(self):
+        return {key: dev.get_io_metrics() for key, dev in self.devices.items()}
 
     def get_status(self):
         posns = [dev.get_position() for dev in self.devices.values()]
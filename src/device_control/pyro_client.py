@@ -0,0 +1,198 @@
+import copy
+import threading
+
+from swmain.network.pyroclient import connect
+
+__all__ = ["Batch", "BatchError", "Subscription", "forget", "get_proxy"]
+
+# first proxy made for each key, copied for other threads instead of asking the name server
+_templates = {}
+# bumped by `forget`, so every thread drops its proxy for the key on next use
+_generations = {}
+_templates_lock = threading.Lock()
+# Pyro proxies belong to the thread which made them
+_local = threading.local()
+
+
+def _thread_proxies():
+    proxies = getattr(_local, "proxies", None)
+    if proxies is None:
+        proxies = _local.proxies = {}
+    return proxies
+
+
+def get_proxy(pyro_key):
+    """
+    Get a Pyro proxy for `pyro_key`, cached for this thread.
+
+    The name server is only asked the first time a key is used in the process. Other
+    threads get a copy of that proxy, which connects to the same URI. After a daemon
+    restart its URI changes, so call `forget` when a call fails with a communication
+    error. The next `get_proxy`, in any thread, then looks the key up again.
+    """
+    proxies = _thread_proxies()
+    with _templates_lock:
+        generation = _generations.get(pyro_key, 0)
+        template = _templates.get(pyro_key)
+    cached = proxies.get(pyro_key)
+    if cached is not None:
+        cached_generation, proxy = cached
+        if cached_generation == generation:
+            return proxy
+        # forgotten since, only this thread may release its proxy
+        del proxies[pyro_key]
+        release = getattr(proxy, "_pyroRelease", None)
+        if release is not None:
+            release()
+    if template is None:
+        proxy = connect(pyro_key)
+        with _templates_lock:
+            if _generations.get(pyro_key, 0) == generation:
+                _templates.setdefault(pyro_key, proxy)
+    else:
+        proxy = copy.copy(template)
+    proxies[pyro_key] = (generation, proxy)
+    return proxy
+
+
+def forget(pyro_key):
+    """Drop the cached proxies for `pyro_key`, in every thread"""
+    with _templates_lock:
+        _templates.pop(pyro_key, None)
+        _generations[pyro_key] = _generations.get(pyro_key, 0) + 1
+
+
+def _is_communication_error(exc):
+    # Pyro's CommunicationError and subclasses, without importing Pyro here
+    return any(cls.__name__ == "CommunicationError" for cls in type(exc).__mro__)
+
+
+class BatchError(RuntimeError):
+    def __init__(self, msg, results):
+        super().__init__(msg)
+        self.results = results
+
+
+class Batch:
+    """
+    Builder for a batch of device calls, sent to a daemon's `BatchExecutor` in one Pyro
+    round trip.
+
+    Examples
+    --------
+    >>> batch = Batch(VAMPIRES.BATCH)
+    >>> batch.add("filt", "move_configuration", "Open")
+    >>> batch.add("diff", "move_configuration", "Open / Open")
+    >>> batch.add("trig", "set_parameters", pulse_width=20)
+    >>> batch.add("status", "get_status")
+    >>> *_, status = batch.run(parallel=True)
+    """
+
+    def __init__(self, pyro_key):
+        self.pyro_key = pyro_key
+        self.calls = []
+
+    def __len__(self):
+        return len(self.calls)
+
+    def add(self, device, method, *args, **kwargs):
+        self.calls.append((device, method, args, kwargs))
+        return self
+
+    def clear(self):
+        self.calls = []
+
+    def run(self, parallel=False, stop_on_error=False, timeout=None, raise_errors=True):
+        """
+        Send the batch and return the result of each call, in order.
+
+        If any call failed, a `BatchError` listing every failure is raised (unless
+        `raise_errors` is False), with the full entries (see `BatchExecutor`) in its
+        ``results``. With `raise_errors` False, the full entries are returned instead of
+        the results.
+        """
+        executor = get_proxy(self.pyro_key)
+        try:
+            entries = executor.run(
+                self.calls, parallel=parallel, stop_on_error=stop_on_error, timeout=timeout
+            )
+        except Exception as exc:
+            if _is_communication_error(exc):
+                forget(self.pyro_key)
+            raise
+        if not raise_errors:
+            return entries
+        errors = [
+            f"{device}.{method}: {entry['e']}"
+            for (device, method, *_), entry in zip(self.calls, entries, strict=True)
+            if entry["e"] is not None
+        ]
+        if len(errors) > 0:
+            msg = "batch calls failed:\n" + "\n".join(errors)
+            raise BatchError(msg, entries)
+        return [entry["r"] for entry in entries]
+
+
+class Subscription:
+    """
+    Status change events from a daemon's `StatusPublisher`.
+
+    Iterating waits for events and yields them one by one. If the daemon restarts or
+    the subscription expires, the next poll subscribes again, and the current values are
+    delivered afresh.
+
+    Examples
+    --------
+    >>> with Subscription(VAMPIRES.EVENTS, devices=["filt", "diff"], interval=0.5) as sub:
+    ...     for event in sub:
+    ...         print(event["device"], event["key"], event["value"])
+    """
+
+    def __init__(self, pyro_key, devices=None, keys=None, interval=0, timeout=10):
+        self.pyro_key = pyro_key
+        self.devices = devices
+        self.keys = keys
+        self.interval = interval  # s
+        self.timeout = timeout  # s
+        self.sub_id = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def open(self):
+        publisher = get_proxy(self.pyro_key)
+        self.sub_id = publisher.subscribe(self.devices, self.keys, self.interval)
+
+    def close(self):
+        if self.sub_id is None:
+            return
+        try:
+            get_proxy(self.pyro_key).unsubscribe(self.sub_id)
+        except Exception as exc:
+            if _is_communication_error(exc):
+                forget(self.pyro_key)
+        self.sub_id = None
+
+    def poll(self):
+        """Wait up to `timeout` seconds and return the events which arrived"""
+        if self.sub_id is None:
+            self.open()
+        try:
+            return get_proxy(self.pyro_key).poll_events(self.sub_id, self.timeout)
+        except ValueError:
+            # expired, or the daemon restarted
+            self.sub_id = None
+            return []
+        except Exception as exc:
+            if _is_communication_error(exc):
+                forget(self.pyro_key)
+                self.sub_id = None
+            raise
+
+    def __iter__(self):
+        while True:
+            yield from self.poll()
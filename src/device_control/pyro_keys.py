@@ -1,4 +1,4 @@
-__all__ = ["VAMPIRES", "PYRO_KEYS", "VISWFS"]
+__all__ = ["VAMPIRES", "PYRO_KEYS", "SCEXAO2", "VISWFS"]
 
 
 class VAMPIRES:
@@ -16,6 +16,10 @@ class VAMPIRES:
     QWP2: str = "VAMPIRES_QWP2"
     TC: str = "VAMPIRES_TC"
     TRIG: str = "VAMPIRES_TRIG"
+    # daemon-wide objects
+    STATUS: str = "VAMPIRES_STATUS"
+    BATCH: str = "VAMPIRES_BATCH"
+    EVENTS: str = "VAMPIRES_EVENTS"
 
 class VISWFS:
     PICKOFFBS: str = "VISWFS_PICKOFFBS"
@@ -26,7 +30,18 @@ class VISWFS:
     RS2: str = "VISWFS_RS2"
     FLIPMOUNT1: str = "VISWFS_FLIPMOUNT1"
     FLIPMOUNT2: str = "VISWFS_FLIPMOUNT2"
+    # daemon-wide objects
+    STATUS: str = "VISWFS_STATUS"
+    BATCH: str = "VISWFS_BATCH"
+    EVENTS: str = "VISWFS_EVENTS"
+
+class SCEXAO2:
+    # daemon-wide objects
+    STATUS: str = "SCEXAO2_STATUS"
+    BATCH: str = "SCEXAO2_BATCH"
+    EVENTS: str = "SCEXAO2_EVENTS"
 
 class PYRO_KEYS:
     VAMPIRES = VAMPIRES
+    SCEXAO2 = SCEXAO2
     VISWFS = VISWFS
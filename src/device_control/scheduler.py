@@ -0,0 +1,210 @@
+import asyncio
+import functools
+import heapq
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from enum import IntEnum
+
+__all__ = ["Priority", "PortScheduler", "io_priority", "with_priority"]
+
+
+class Priority(IntEnum):
+    """Transaction priorities, most urgent first"""
+
+    STOP = 0
+    MOVE = 1
+    STATUS = 2
+    POLL = 3
+
+
+_local = threading.local()
+
+
+def current_priority() -> Priority:
+    priority = getattr(_local, "priority", None)
+    if priority is None:
+        return Priority.STATUS
+    return priority
+
+
+@contextmanager
+def io_priority(priority: Priority):
+    """
+    Set the priority of every port transaction made by this thread within the block.
+
+    Nested blocks keep the most urgent priority, so the position read-backs made during
+    a move are still scheduled as part of the move.
+    """
+    previous = getattr(_local, "priority", None)
+    _local.priority = priority if previous is None else min(previous, priority)
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+def with_priority(priority: Priority):
+    """Decorator version of `io_priority`"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with io_priority(priority):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class PortScheduler:
+    """
+    Serializes transactions (one command and its reply) on a physical port.
+
+    Waiting transactions are granted in priority order (see `Priority`). Within a priority,
+    the owners sharing the port (e.g. the devices on a Zaber daisy chain) are served
+    fairly: every request is tagged with its owner's virtual time, which advances with each
+    request the owner queues, and the lowest tag goes first. Transactions are re-entrant within
+    a thread. Use `PortScheduler.for_port` to get the scheduler shared by every device on
+    a port.
+    """
+
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, port=None):
+        self.port = port
+        self._cond = threading.Condition()
+        self._holder = None
+        self._depth = 0
+        self._waiting = []
+        self._counter = itertools.count()
+        self._vtimes = {}
+        self._vtime = 0
+        self._max_depth = 0
+        self._stats = {p: {"count": 0, "wait_total": 0.0, "wait_max": 0.0} for p in Priority}
+        self._owner_counts = {}
+
+    @classmethod
+    def for_port(cls, port):
+        with cls._registry_lock:
+            if port not in cls._registry:
+                cls._registry[port] = cls(port)
+            return cls._registry[port]
+
+    @contextmanager
+    def transaction(self, owner=None, priority=None):
+        if priority is None:
+            priority = current_priority()
+        thread = threading.get_ident()
+        with self._cond:
+            if self._holder == thread:
+                self._depth += 1
+                reentrant = True
+            else:
+                reentrant = False
+                self._acquire(thread, owner, priority)
+        try:
+            yield
+        finally:
+            self._release(reentrant)
+
+    @asynccontextmanager
+    async def atransaction(self, owner=None, priority=None, poll=0.005):
+        """
+        `transaction` for coroutines. The port is held by the current task rather than
+        the thread, and the task polls for its turn every `poll` s instead of blocking the
+        event loop. Tasks share their thread's `io_priority`, so give `priority` here.
+        """
+        if priority is None:
+            priority = current_priority()
+        task = asyncio.current_task()
+        with self._cond:
+            reentrant = self._holder is task
+            if reentrant:
+                self._depth += 1
+            else:
+                ticket = self._enqueue(owner, priority)
+        if not reentrant:
+            t0 = time.monotonic()
+            try:
+                while True:
+                    with self._cond:
+                        if self._holder is None and self._waiting[0] == ticket:
+                            self._grant(ticket, task, owner, t0)
+                            break
+                    await asyncio.sleep(poll)
+            except BaseException:
+                # cancelled while queued, give the place up
+                with self._cond:
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                    self._cond.notify_all()
+                raise
+        try:
+            yield
+        finally:
+            self._release(reentrant)
+
+    def _release(self, reentrant):
+        with self._cond:
+            if reentrant:
+                self._depth -= 1
+            else:
+                self._holder = None
+                self._cond.notify_all()
+
+    def _enqueue(self, owner, priority):
+        # called with the condition held
+        # an idle owner re-joins at the current virtual time instead of catching up
+        vtime = max(self._vtimes.get(owner, self._vtime), self._vtime)
+        self._vtimes[owner] = vtime + 1
+        ticket = (priority, vtime, next(self._counter))
+        heapq.heappush(self._waiting, ticket)
+        self._max_depth = max(self._max_depth, len(self._waiting))
+        return ticket
+
+    def _grant(self, ticket, holder, owner, t0):
+        # called with the condition held, once `ticket` is first in line and the port free
+        heapq.heappop(self._waiting)
+        self._holder = holder
+        priority, vtime, _ = ticket
+        self._vtime = max(self._vtime, vtime)
+        wait = time.monotonic() - t0
+        stats = self._stats[priority]
+        stats["count"] += 1
+        stats["wait_total"] += wait
+        stats["wait_max"] = max(stats["wait_max"], wait)
+        self._owner_counts[owner] = self._owner_counts.get(owner, 0) + 1
+
+    def _acquire(self, thread, owner, priority):
+        # called with the condition held
+        ticket = self._enqueue(owner, priority)
+        t0 = time.monotonic()
+        while self._holder is not None or self._waiting[0] != ticket:
+            self._cond.wait()
+        self._grant(ticket, thread, owner, t0)
+
+    def queue_depth(self) -> int:
+        return len(self._waiting)
+
+    def get_metrics(self):
+        with self._cond:
+            waits = {}
+            for priority, stats in self._stats.items():
+                count = stats["count"]
+                waits[priority.name.lower()] = {
+                    "count": count,
+                    "wait_mean": stats["wait_total"] / count if count > 0 else 0.0,
+                    "wait_max": stats["wait_max"],
+                }
+            return {
+                "port": self.port,
+                "queue_depth": len(self._waiting),
+                "max_queue_depth": self._max_depth,
+                "busy": self._holder is not None,
+                "priorities": waits,
+                "owners": {str(k): v for k, v in self._owner_counts.items()},
+            }
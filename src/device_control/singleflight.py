@@ -0,0 +1,86 @@
+import functools
+import threading
+
+from device_control.scheduler import current_priority
+
+__all__ = ["SingleFlightMixin", "single_flight"]
+
+# read-only queries which are safe to share between concurrent callers
+COALESCED_METHODS = ("get_status", "get_position", "get_parameters", "get_temp")
+
+
+class _Flight:
+    __slots__ = ("done", "error", "result", "thread")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.thread = threading.get_ident()
+        self.result = None
+        self.error = None
+
+
+def single_flight(func):
+    """
+    Collapse concurrent identical calls of a method into one.
+
+    The first caller runs the method; callers arriving with the same instance, arguments
+    and I/O priority (see `scheduler.io_priority`) while it is running wait for it and
+    receive the same result (or exception). A caller never joins a flight queued behind
+    less urgent work.
+    Calls with unhashable arguments and re-entrant calls from the running thread are
+    passed straight through.
+    """
+    flights = {}
+    lock = threading.Lock()
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        key = (id(self), current_priority(), args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return func(self, *args, **kwargs)
+
+        with lock:
+            flight = flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = flights[key] = _Flight()
+        if not leader:
+            if flight.thread == threading.get_ident():
+                return func(self, *args, **kwargs)
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = func(self, *args, **kwargs)
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with lock:
+                del flights[key]
+            flight.done.set()
+        return flight.result
+
+    wrapper.__single_flight__ = True
+    return wrapper
+
+
+class SingleFlightMixin:
+    """
+    Applies `single_flight` to the status queries of every subclass.
+
+    Subclasses can change which methods are coalesced with `SINGLE_FLIGHT_METHODS`.
+    """
+
+    SINGLE_FLIGHT_METHODS = COALESCED_METHODS
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name in cls.SINGLE_FLIGHT_METHODS:
+            method = cls.__dict__.get(name)
+            if callable(method) and not getattr(method, "__single_flight__", False):
+                setattr(cls, name, single_flight(method))
@@ -0,0 +1,149 @@
+import socket
+import threading
+from contextlib import contextmanager
+from logging import getLogger
+
+import paramiko
+
+__all__ = ["SSHConnection", "get_connection"]
+
+logger = getLogger(__name__)
+
+# OpenSSH allows 10 sessions (exec or shell channels) per connection by default
+DEFAULT_MAX_SESSIONS = 8
+DEFAULT_KEEPALIVE = 30  # s
+
+
+class SSHConnection:
+    """
+    SSH connection to one host, shared by every device in the process talking to it.
+
+    Use `get_connection` rather than creating these directly. The connection is made on
+    first use and remade whenever the transport is found dead, so callers should ask for
+    the client or transport each time instead of keeping them. Session channels (exec
+    and shell) are limited to `max_sessions` at once to stay under the server's limit;
+    forwarded (``direct-tcpip``) channels are not.
+    """
+
+    def __init__(
+        self,
+        host,
+        user=None,
+        keepalive=DEFAULT_KEEPALIVE,
+        max_sessions=DEFAULT_MAX_SESSIONS,
+        **connect_kwargs,
+    ):
+        self.host = host
+        self.user = user
+        self.keepalive = keepalive  # s
+        self.connect_kwargs = connect_kwargs
+        self.reconnects = 0
+        self._client = None
+        self._lock = threading.Lock()
+        self._sessions = threading.BoundedSemaphore(max_sessions)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.user}@{self.host})"
+
+    def _connect(self):
+        if self._client is not None:
+            self._client.close()
+            self.reconnects += 1
+            logger.warning(f"reconnecting to {self.user}@{self.host}")
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.load_system_host_keys()
+        client.connect(self.host, username=self.user, **self.connect_kwargs)
+        transport = client.get_transport()
+        transport.set_keepalive(self.keepalive)
+        # commands and replies are small, don't let Nagle's algorithm hold them back
+        transport.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._client = client
+
+    def is_active(self) -> bool:
+        if self._client is None:
+            return False
+        transport = self._client.get_transport()
+        return transport is not None and transport.is_active()
+
+    def get_client(self) -> paramiko.SSHClient:
+        with self._lock:
+            if not self.is_active():
+                self._connect()
+            return self._client
+
+    def get_transport(self) -> paramiko.Transport:
+        return self.get_client().get_transport()
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+            self._client = None
+
+    def _drop(self):
+        # close a failed connection; the next use reconnects
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+
+    def acquire_session(self):
+        self._sessions.acquire()
+
+    def release_session(self):
+        self._sessions.release()
+
+    @contextmanager
+    def session(self):
+        """Hold one of the session channel slots for the duration of the block"""
+        self.acquire_session()
+        try:
+            yield
+        finally:
+            self.release_session()
+
+    def open_channel(self, kind="direct-tcpip", dest_addr=None, src_addr=None, timeout=None):
+        """Open a channel, reconnecting once if the connection has died"""
+        for attempt in range(2):
+            try:
+                return self.get_transport().open_channel(kind, dest_addr, src_addr, timeout=timeout)
+            except (OSError, EOFError, paramiko.SSHException):
+                if attempt > 0:
+                    raise
+                self._drop()
+        return None
+
+    def exec_command(self, command: str, timeout=None, wait=True) -> str:
+        """
+        Run a command on the host and return its standard output. With ``wait=False``
+        the command is started and left running, and None is returned.
+        """
+        with self.session():
+            for attempt in range(2):
+                try:
+                    _, stdout, _ = self.get_client().exec_command(command, timeout=timeout)
+                    if not wait:
+                        return None
+                    return stdout.read().decode()
+                except (OSError, EOFError, paramiko.SSHException):
+                    if attempt > 0:
+                        raise
+                    self._drop()
+        return None
+
+
+_connections = {}
+_connections_lock = threading.Lock()
+
+
+def get_connection(host, user=None, **kwargs) -> SSHConnection:
+    """
+    Get the shared connection to `user@host`. Extra keyword arguments (e.g.
+    ``disabled_algorithms``) are passed to `paramiko.SSHClient.connect` and only take
+    effect for the first caller.
+    """
+    key = (host, user)
+    with _connections_lock:
+        if key not in _connections:
+            _connections[key] = SSHConnection(host, user=user, **kwargs)
+        return _connections[key]
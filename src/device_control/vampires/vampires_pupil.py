@@ -1,6 +1,5 @@
 import os
 import sys
-import time
 
 from docopt import docopt
 from scxconf.pyrokeys import VAMPIRES
@@ -46,7 +45,6 @@ def main():
         print(status)
     elif args["<pos>"]:
         vampires_pupil.move_configuration_name(args["<pos>"])
-        time.sleep(0.5)
     vampires_pupil.update_keys(posn)
 
 
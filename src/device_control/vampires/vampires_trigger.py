@@ -1,12 +1,15 @@
 import os
-import subprocess
+import threading
 import time
+from pathlib import Path
 
 import astropy.units as u
 import click
+import tomli
 import usb.core
 import usb.util
 from scxconf.pyrokeys import VAMPIRES
+from serial import SerialException
 from swmain.redis import update_keys
 
 from device_control.base import ConfigurableDevice
@@ -20,17 +23,66 @@ class ArduinoTimeoutError(ArduinoError):
     pass
 
 
+def _check_ok(response: bytes):
+    if len(response) == 0:
+        msg = 'Arduino did not respond within timeout, which suggests it is locked up waiting for a "ready" response from the cameras. Try resetting the trigger.'
+        raise ArduinoTimeoutError(msg)
+    if response.strip() != b"OK":
+        raise ArduinoError(response.decode().strip())
+
+
+def _sleep_until(target: float, spin=2e-3):
+    # coarse sleep, then spin on the monotonic clock for the last couple of ms
+    remaining = target - time.monotonic()
+    if remaining > spin:
+        time.sleep(remaining - spin)
+    while time.monotonic() < target:
+        pass
+
+
+def _to_us(value) -> int:
+    if isinstance(value, u.Quantity):
+        return int(value.to(u.us).value)
+    return int(value)
+
+
+# trigger parameters which can be changed within a sequence
+SEQUENCE_PARAMETERS = (
+    "pulse_width",
+    "flc_offset",
+    "jitter_half_width",
+    "flc_enabled",
+    "sweep_mode",
+)
+
+
 class VAMPIRESTrigger(ConfigurableDevice):
+    """
+    VAMPIRES external trigger (Arduino)
+
+    The trigger keeps a shadow copy of the Arduino parameters. It is refreshed by a full
+    read (`read_parameters`), and updated in place whenever a command which changes the
+    parameters is acknowledged with ``OK``, so that setting parameters or enabling the
+    trigger doesn't need a read-back. After a reset the shadow is invalid until the next
+    read.
+    """
+
     CONF = "vampires/conf_vampires_trigger.toml"
     PYRO_KEY = VAMPIRES.TRIG
+    # how long before each sequence step the port is taken
+    sequence_margin = 0.01  # s
 
     def __init__(
         self,
         serial_kwargs=None,
         pulse_width: int = 10,  # us
         flc_offset: int = 20,  # us
+        jitter_half_width: int = 0,  # us
         flc_enabled: bool = False,
         sweep_mode: bool = False,
+        watchdog: bool = False,
+        max_recoveries: int = 2,
+        recovery_timeout: float = 10,  # s
         **kwargs,
     ):
         def_serial_kwargs = {"baudrate": 115200, "timeout": 0.5}
@@ -38,27 +90,41 @@ class VAMPIRESTrigger(ConfigurableDevice):
         super().__init__(serial_kwargs=def_serial_kwargs, **kwargs)
         self.reset_switch = VAMPIRESInlineUSBReset(serial="YKD6404")
 
-        if isinstance(pulse_width, u.Quantity):
-            self.pulse_width = int(pulse_width.to(u.us).value)
-        if isinstance(flc_offset, u.Quantity):
-            self.flc_offset = int(flc_offset.to(u.us).value)
         self.enabled = False
-        self.pulse_width = int(pulse_width)
-        self.flc_offset = int(flc_offset)
+        self.pulse_width = _to_us(pulse_width)
+        self.flc_offset = _to_us(flc_offset)
+        self.jitter_half_width = _to_us(jitter_half_width)
         self.flc_enabled = flc_enabled
         self.sweep_mode = sweep_mode
+        # whether the attributes above are known to match the Arduino
+        self._shadow_valid = False
+
+        self.watchdog = watchdog
+        self.max_recoveries = max_recoveries
+        self.recovery_timeout = recovery_timeout
+        self.recoveries = 0
+        self.last_recovery_time = None
+        self._recovery_lock = threading.RLock()
+        self._recovering = False
+
+        self._sequence_thread = None
+        self._sequence_abort = threading.Event()
+        self._sequence_log = []
+        self._sequence_error = None
 
     def send_command(self, command):
+        return self._watched(self._send_command, command)
+
+    def ask_command(self, command):
+        return self._watched(self._ask_command, command)
+
+    def _send_command(self, command):
         with self.serial as serial:
             serial.write(f"{command}\n".encode())
             response = serial.readline()
-            if len(response) == 0:
-                msg = 'Arduino did not respond within timeout, which suggests it is locked up waiting for a "ready" response from the cameras. Try resetting the trigger.'
-                raise ArduinoTimeoutError(msg)
-            if response.strip() != b"OK":
-                raise ArduinoError(response.decode().strip())
+        _check_ok(response)
 
-    def ask_command(self, command):
+    def _ask_command(self, command):
         with self.serial as serial:
             serial.write(f"{command}\n".encode())
             response = serial.readline().decode().strip()
@@ -67,50 +133,131 @@ class VAMPIRESTrigger(ConfigurableDevice):
                 raise ArduinoTimeoutError(msg)
             return response
 
+    def _watched(self, func, command):
+        try:
+            return func(command)
+        except ArduinoTimeoutError:
+            if not self.watchdog or self._recovering:
+                raise
+        for attempt in range(self.max_recoveries):
+            try:
+                self.recover()
+                return func(command)
+            except (ArduinoError, SerialException) as exc:
+                self.logger.warning(f"recovery attempt {attempt + 1} failed: {exc}")
+        msg = f"Arduino still unresponsive after {self.max_recoveries} recovery attempts"
+        raise ArduinoTimeoutError(msg)
+
+    def get_watchdog(self) -> bool:
+        return self.watchdog
+
+    def set_watchdog(self, value: bool):
+        self.watchdog = bool(value)
+
+    def get_watchdog_status(self):
+        return {
+            "watchdog": self.watchdog,
+            "recoveries": self.recoveries,
+            "last_recovery_time": self.last_recovery_time,
+        }
+
+    def recover(self):
+        """
+        Power-cycle the Arduino and restore its last known parameters and enable state.
+
+        Returns
+        -------
+        float
+            The time taken to recover, in s
+        """
+        with self._recovery_lock:
+            self._recovering = True
+            t0 = time.monotonic()
+            try:
+                params = self._shadow()
+                self.logger.warning("Arduino locked up, power-cycling it")
+                self.reset()
+                self._wait_until_ready(t0 + self.recovery_timeout)
+                self.set_parameters(
+                    flc_enabled=params["flc_enabled"],
+                    flc_offset=params["flc_offset"],
+                    pulse_width=params["pulse_width"],
+                    jitter_half_width=params["jitter_half_width"],
+                    sweep_mode=params["sweep_mode"],
+                )
+                if params["enabled"]:
+                    self.enable()
+            finally:
+                self._recovering = False
+            elapsed = time.monotonic() - t0
+            self.recoveries += 1
+            self.last_recovery_time = elapsed
+            self.logger.warning(f"Arduino recovered in {elapsed:.2f} s")
+            return elapsed
+
+    def _wait_until_ready(self, deadline):
+        # wait for the port to re-enumerate, then for the Arduino to answer
+        port = Path(self.serial_kwargs["port"])
+        while True:
+            try:
+                if port.exists():
+                    self.read_parameters()
+                    return
+            except (ArduinoError, SerialException, ValueError, StopIteration):
+                pass
+            if time.monotonic() > deadline:
+                msg = f"Arduino did not come back on {port} after reset"
+                raise ArduinoTimeoutError(msg)
+            time.sleep(0.05)
+
     def get_jitter_half_width(self) -> int:
         return self.jitter_half_width
 
     def set_jitter_half_width(self, value):
-        if isinstance(value, u.Quantity):
-            self.jitter_half_width = int(self.jitter_half_width.to(u.us).value)
-        else:
-            self.jitter_half_width = int(value)
-        self.set_parameters()
+        self.set_parameters(jitter_half_width=_to_us(value))
 
     def get_pulse_width(self) -> int:
         return self.pulse_width
 
     def set_pulse_width(self, value):
-        if isinstance(value, u.Quantity):
-            self.pulse_width = int(self.pulse_width.to(u.us).value)
-        else:
-            self.pulse_width = int(value)
-        self.set_parameters()
+        self.set_parameters(pulse_width=_to_us(value))
 
     def get_flc_offset(self) -> int:
         return self.flc_offset
 
     def set_flc_offset(self, value):
-        if isinstance(value, u.Quantity):
-            self.flc_offset = int(self.flc_offset.to(u.us).value)
-        else:
-            self.flc_offset = int(value)
-        self.set_parameters()
+        self.set_parameters(flc_offset=_to_us(value))
 
     def is_flc_enabled(self) -> bool:
         return self.flc_enabled
 
     def enable_flc(self):
-        self.flc_enabled = True
-        self.set_parameters()
-        self.update_keys()
+        self.set_parameters(flc_enabled=True)
 
     def disable_flc(self):
-        self.flc_enabled = False
-        self.set_parameters()
-        self.update_keys()
+        self.set_parameters(flc_enabled=False)
 
-    def get_parameters(self):
+    def _shadow(self):
+        return {
+            "enabled": self.enabled,
+            "pulse_width": self.pulse_width,
+            "flc_offset": self.flc_offset,
+            "jitter_half_width": self.jitter_half_width,
+            "flc_enabled": self.flc_enabled,
+            "sweep_mode": self.sweep_mode,
+        }
+
+    def get_parameters(self, refresh=False):
+        """
+        Get the trigger parameters from the shadow copy, only querying the Arduino if
+        `refresh` is True or the shadow has not been verified since startup or a reset.
+        """
+        if refresh or not self._shadow_valid:
+            return self.read_parameters()
+        return self._shadow()
+
+    def read_parameters(self):
+        """Query the Arduino for all of its parameters and refresh the shadow copy"""
         response = self.ask_command(0)
         tokens = map(int, response.split())
         self.enabled = bool(next(tokens))
@@ -120,17 +267,17 @@ class VAMPIRESTrigger(ConfigurableDevice):
         trigger_mode = next(tokens)
         self.flc_enabled = bool(trigger_mode & 0x1)
         self.sweep_mode = bool(trigger_mode & 0x2)
-        params = {
-            "enabled": self.enabled,
-            "pulse_width": self.pulse_width,
-            "flc_offset": self.flc_offset,
-            "jitter_half_width": self.jitter_half_width,
-            "flc_enabled": self.flc_enabled,
-            "sweep_mode": self.sweep_mode,
-        }
+        self._shadow_valid = True
+        params = self._shadow()
         self.update_keys(params=params)
         return params
 
+    @staticmethod
+    def encode_parameters(pulse_width, flc_offset, jitter_half_width, flc_enabled, sweep_mode):
+        """Format the Arduino command which sets the given parameters"""
+        trigger_mode = int(flc_enabled) + (int(sweep_mode) << 1)
+        return f"1 {pulse_width:d} {flc_offset:d} {jitter_half_width:d} {trigger_mode:d}"
+
     def set_parameters(
         self,
         flc_enabled=None,
@@ -150,17 +297,17 @@ class VAMPIRESTrigger(ConfigurableDevice):
         if sweep_mode is None:
             sweep_mode = self.sweep_mode
 
-        trigger_mode = int(flc_enabled) + (int(sweep_mode) << 1)
-        cmd = f"1 {pulse_width:d} {flc_offset:d} {jitter_half_width:d} {trigger_mode:d}"
-        self.send_command(cmd)
-        params = dict(
-            enabled=self.enabled,
-            pulse_width=pulse_width,
-            flc_offset=flc_offset,
-            jitter_half_width=jitter_half_width,
-            flc_enabled=flc_enabled,
+        cmd = self.encode_parameters(
+            pulse_width, flc_offset, jitter_half_width, flc_enabled, sweep_mode
         )
-        self.update_keys(params=params)
+        self.send_command(cmd)
+        # the Arduino acknowledged, so it now holds exactly what we sent
+        self.pulse_width = pulse_width
+        self.flc_offset = flc_offset
+        self.jitter_half_width = jitter_half_width
+        self.flc_enabled = bool(flc_enabled)
+        self.sweep_mode = bool(sweep_mode)
+        self.update_keys(params=self._shadow())
 
     def disable(self):
         self.send_command(2)
@@ -168,16 +315,20 @@ class VAMPIRESTrigger(ConfigurableDevice):
         self.update_keys(self.enabled)
 
     def enable(self):
+        self.send_command(3)
         self.enabled = True
         self.update_keys(self.enabled)
-        self.send_command(3)
 
     def reset(self):
         # toggle power using inline switch
         self.reset_switch.disable()
         time.sleep(0.1)
         self.reset_switch.enable()
+        # the port re-enumerates, reopen it on next use
+        self.serial.close()
         self.enabled = False
+        # the Arduino comes back with its power-on parameters
+        self._shadow_valid = False
         update_keys(U_TRIGEN=str(False))
 
     def update_keys(self, enabled=None, params=None):
@@ -197,80 +348,279 @@ class VAMPIRESTrigger(ConfigurableDevice):
             U_TRIGPW=pulse_width,
         )
 
+    def _encode_schedule(self, schedule):
+        # resolve every step against the previous one and pre-encode its command
+        params = self._shadow()
+        steps = []
+        for step in schedule:
+            unknown = set(step) - {"dwell", *SEQUENCE_PARAMETERS}
+            if unknown:
+                msg = f"Unknown sequence parameters: {', '.join(sorted(unknown))}"
+                raise ValueError(msg)
+            params = {**params, **{k: step[k] for k in SEQUENCE_PARAMETERS if k in step}}
+            for key in ("pulse_width", "flc_offset", "jitter_half_width"):
+                params[key] = _to_us(params[key])
+            cmd = self.encode_parameters(
+                params["pulse_width"],
+                params["flc_offset"],
+                params["jitter_half_width"],
+                params["flc_enabled"],
+                params["sweep_mode"],
+            )
+            steps.append((f"{cmd}\n".encode(), float(step.get("dwell", 0)), params))
+        return steps
+
+    def run_sequence(self, schedule, block=True, lead_time=0.05):
+        """
+        Apply a timed series of trigger parameter sets.
+
+        Every step is encoded before the sequence starts, and each step is applied at a
+        fixed offset from the start on the monotonic clock (the sum of the previous dwell
+        times), so timing errors don't accumulate. The port is only taken from just before
+        each step until it is acknowledged, so status reads carry on during the dwell
+        times, and a step the Arduino does not answer goes through the watchdog like any
+        other command. The exact time each step was applied is logged and returned (see
+        also `get_sequence_log`). The error of a background sequence which failed is
+        raised by `stop_sequence`.
+
+        Parameters
+        ----------
+        schedule : list of dict
+            Each step has a ``dwell`` time in s, plus any of ``pulse_width``,
+            ``flc_offset``, ``jitter_half_width``, ``flc_enabled`` or ``sweep_mode``.
+            Parameters not given are carried over from the previous step.
+        block : bool, optional
+            If False, run in a background thread and return immediately
+        lead_time : float, optional
+            Delay before the first step, in s
+
+        Returns
+        -------
+        list of dict or None
+            The sequence log, if blocking
+        """
+        if self.is_sequence_running():
+            msg = "A trigger sequence is already running"
+            raise RuntimeError(msg)
+        steps = self._encode_schedule(schedule)
+        self._sequence_abort.clear()
+        self._sequence_log = []
+        self._sequence_error = None
+        if block:
+            return self._run_steps(steps, lead_time)
+        self._sequence_thread = threading.Thread(
+            target=self._run_background,
+            args=(steps, lead_time),
+            name="trigger-sequence",
+            daemon=True,
+        )
+        self._sequence_thread.start()
+        return None
+
+    def _run_background(self, steps, lead_time):
+        try:
+            self._run_steps(steps, lead_time)
+        except Exception as exc:
+            self.logger.error(f"trigger sequence failed: {exc!r}")
+            self._sequence_error = exc
+
+    def _send_step(self, step):
+        # the step's payload is sent on time, once the port is ours
+        payload, target = step
+        with self.serial as serial:
+            _sleep_until(target)
+            t_send = time.monotonic()
+            serial.write(payload)
+            response = serial.readline()
+        t_ack = time.monotonic()
+        _check_ok(response)
+        return t_send, t_ack
+
+    def _run_steps(self, steps, lead_time):
+        log = self._sequence_log
+        t0 = time.monotonic() + lead_time
+        target = t0
+        try:
+            for index, (payload, dwell, params) in enumerate(steps):
+                if self._sequence_abort.is_set():
+                    self.logger.info(f"trigger sequence aborted before step {index}")
+                    break
+                _sleep_until(target - self.sequence_margin)
+                t_send, t_ack = self._watched(self._send_step, (payload, target))
+                self.pulse_width = params["pulse_width"]
+                self.flc_offset = params["flc_offset"]
+                self.jitter_half_width = params["jitter_half_width"]
+                self.flc_enabled = bool(params["flc_enabled"])
+                self.sweep_mode = bool(params["sweep_mode"])
+                entry = {
+                    "step": index,
+                    "time": time.time(),
+                    "target": target - t0,
+                    "applied": t_send - t0,
+                    "acknowledged": t_ack - t0,
+                    "params": params,
+                }
+                log.append(entry)
+                self.logger.info(
+                    f"sequence step {index} applied at {entry['applied']:.6f} s "
+                    f"(late by {(t_send - target) * 1e6:.0f} us): {payload.decode().strip()}"
+                )
+                target += dwell
+        finally:
+            self.update_keys(params=self._shadow())
+        return log
+
+    def stop_sequence(self):
+        """Stop the sequence after its current step, raising its error if it failed"""
+        self._sequence_abort.set()
+        if self._sequence_thread is not None:
+            self._sequence_thread.join()
+        error, self._sequence_error = self._sequence_error, None
+        if error is not None:
+            raise error
+
+    def is_sequence_running(self) -> bool:
+        return self._sequence_thread is not None and self._sequence_thread.is_alive()
+
+    def get_sequence_log(self):
+        return list(self._sequence_log)
+
     def _config_extras(self):
-        return {"delay": self.delay, "pulse_width": self.pulse_width, "flc_offset": self.flc_offset}
+        return {
+            "pulse_width": self.pulse_width,
+            "flc_offset": self.flc_offset,
+            "jitter_half_width": self.jitter_half_width,
+            "watchdog": self.watchdog,
+        }
 
-    def get_status(self):
+    def get_status(self, refresh=False):
         switch_status = self.reset_switch.status()
         if switch_status != "ON":
             return f"USB reset switch is {switch_status}"
-        info = self.get_parameters()
+        info = self.get_parameters(refresh=refresh)
         return info
 
 
 class VAMPIRESInlineUSBReset:
-    def __init__(self, serial=None):
+    """
+    YKUSH XS inline USB switch, used to power-cycle the trigger Arduino
+
+    Talks HID directly through pyusb, keeping the device claimed between calls. The
+    port state is cached for `status_ttl` seconds, and updated by `enable`/`disable`.
+    """
+
+    VENDOR_ID = 0x04D8
+    PRODUCT_ID = 0xF0CD
+    # HID commands, see the YKUSH XS protocol reference
+    CMD_PORT_DOWN = 0x01
+    CMD_PORT_UP = 0x11
+    CMD_PORT_STATUS = 0x21
+    REPLY_OK = 0x01
+    STATE_OFF = 0x01
+    STATE_ON = 0x11
+
+    def __init__(self, serial=None, status_ttl=0.5, timeout=100):
         self.serial = serial
         self.outaddr = 0x1
         self.inaddr = 0x81
         self.bufsize = 64
-        self.device = usb.core.find(idVendor=0x04D8, idProduct=0xF0CD)
+        self.timeout = timeout  # ms
+        self.status_ttl = status_ttl  # s
+        self.device = None
+        self._reattach = False
+        self._lock = threading.Lock()
+        self._status = None
+        self._status_time = 0
+
+    def _find(self):
+        if self.serial is None:
+            return usb.core.find(idVendor=self.VENDOR_ID, idProduct=self.PRODUCT_ID)
+
+        def match_serial(dev):
+            try:
+                return usb.util.get_string(dev, dev.iSerialNumber) == self.serial
+            except (usb.core.USBError, ValueError):
+                return False
+
+        return usb.core.find(
+            idVendor=self.VENDOR_ID, idProduct=self.PRODUCT_ID, custom_match=match_serial
+        )
 
-    def __enter__(self):
+    def open(self):
+        device = self._find()
+        if device is None:
+            msg = f"Could not find YKUSH XS switch (serial={self.serial})"
+            raise OSError(msg)
         self._reattach = False
-        if self.device.is_kernel_driver_active(0):
+        if device.is_kernel_driver_active(0):
             self._reattach = True
-            self.device.detach_kernel_driver(0)
-
-        return self.device
-
-    def __exit__(self, *args):
-        usb.util.dispose_resources(self.device)
-        if self._reattach:
-            self.device.attach_kernel_driver(0)
+            device.detach_kernel_driver(0)
+        usb.util.claim_interface(device, 0)
+        self.device = device
+
+    def close(self):
+        if self.device is None:
+            return
+        device = self.device
+        self.device = None
+        try:
+            usb.util.release_interface(device, 0)
+            usb.util.dispose_resources(device)
+            if self._reattach:
+                device.attach_kernel_driver(0)
+        except usb.core.USBError:
+            pass
+
+    def _transact(self, command: int):
+        packet = bytes([command]) + bytes(self.bufsize - 1)
+        with self._lock:
+            # reopen once if the handle went stale (e.g. the hub was replugged)
+            for attempt in range(2):
+                if self.device is None:
+                    self.open()
+                try:
+                    self.device.write(self.outaddr, packet, self.timeout)
+                    return self.device.read(self.inaddr, self.bufsize, self.timeout)
+                except usb.core.USBError:
+                    self.close()
+                    if attempt > 0:
+                        raise
 
     def send_command(self, command: int):
-        with self as device:
-            device.write(self.outaddr, chr(command))
+        reply = self._transact(command)
+        if reply[0] != self.REPLY_OK:
+            msg = f"YKUSH XS switch rejected command {command:#04x}"
+            raise RuntimeError(msg)
+        return reply
 
     def ask_command(self, command: int):
-        with self as device:
-            device.write(self.outaddr, chr(command))
-            reply = device.read(self.inaddr, self.bufsize)
-        return reply
+        return self.send_command(command)
 
-    def enable(self):
-        subprocess.run([f"ykushcmd ykushxs -s {self.serial} -u"], shell=True, check=True)
+    def _set_status(self, value):
+        self._status = value
+        self._status_time = time.monotonic()
 
-        # subprocess.run(command, shell=True, check=True)
-        # reply = self.ask_command(0x11)
-        # assert reply[0] == 0x1
+    def enable(self):
+        self.send_command(self.CMD_PORT_UP)
+        self._set_status("ON")
 
     def disable(self):
-        subprocess.run([f"ykushcmd ykushxs -s {self.serial} -d"], shell=True, check=True)
-        # reply = self.ask_command(0x01)
-        # assert reply[0] == 0x1
-
-    def status(self):
-        result = subprocess.run(
-            [f"ykushcmd ykushxs -s {self.serial} -g"], shell=True, capture_output=True
-        )
-        retval = result.stdout.decode().strip()
-        if "ON" in retval:
-            return "ON"
-        elif "OFF" in retval:
-            return "OFF"
+        self.send_command(self.CMD_PORT_DOWN)
+        self._set_status("OFF")
+
+    def status(self, refresh=False):
+        age = time.monotonic() - self._status_time
+        if not refresh and self._status is not None and age < self.status_ttl:
+            return self._status
+        reply = self.ask_command(self.CMD_PORT_STATUS)
+        if reply[1] == self.STATE_OFF:
+            st = "OFF"
+        elif reply[1] == self.STATE_ON:
+            st = "ON"
         else:
-            return "Unknown"
-        # reply = self.ask_command(0x21)
-        # assert reply[0] == 0x1
-        # if reply[1] == 0x01:
-        #     st = "OFF"
-        # elif reply[1] == 0x11:
-        #     st = "ON"
-        # else:
-        #     st = "UNKNOWN"
-        # return st
+            st = "Unknown"
+        self._set_status(st)
+        return st
 
 
 @click.group("vampires_trigger", no_args_is_help=True)
@@ -297,12 +647,38 @@ def enable(obj):
     short_help="Get the trigger status",
     help="Get the timing parameters and status of the external trigger",
 )
+@click.option("-r", "--refresh", is_flag=True, help="Read the parameters back from the Arduino.")
 @click.pass_obj
-def status(obj):
-    status = obj["trigger"].get_status()
+def status(obj, refresh: bool):
+    status = obj["trigger"].get_status(refresh=refresh)
     click.echo(status)
 
 
+@main.command(help="Enable or disable automatic recovery when the trigger locks up")
+@click.argument("state", type=click.Choice(["on", "off", "status"]))
+@click.pass_obj
+def watchdog(obj, state: str):
+    if state != "status":
+        obj["trigger"].set_watchdog(state == "on")
+    click.echo(obj["trigger"].get_watchdog_status())
+
+
+@main.command(
+    short_help="Run a timed parameter sequence",
+    help="Run a timed sequence of trigger parameters from a TOML file with one [[step]] table per step, each with a 'dwell' time in s and any of the trigger parameters.",
+)
+@click.argument("filename", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.pass_obj
+def sequence(obj, filename: Path):
+    with filename.open("rb") as fh:
+        schedule = tomli.load(fh)["step"]
+    log = obj["trigger"].run_sequence(schedule)
+    for entry in log:
+        click.echo(
+            f"{entry['step']:3d}: target {entry['target']:10.6f} s  applied {entry['applied']:10.6f} s"
+        )
+
+
 @main.command(help="Reset the external trigger")
 @click.pass_obj
 def reset(obj):
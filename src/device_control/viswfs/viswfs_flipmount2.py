@@ -1,6 +1,5 @@
 import os
 import sys
-import time
 
 from docopt import docopt
 from scxconf.pyrokeys import VISWFS
@@ -46,7 +45,6 @@ def main():
         print(status)
     elif args["<pos>"]:
         viswfs_flip.move_configuration_name(args["<pos>"])
-        time.sleep(0.1)
     viswfs_flip.update_keys(posn)
 
 
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from device_control.aio import AsyncCONEXDevice, AsyncMotionDevice
+from device_control.drivers import CONEXDevice
+
+
+class BlockingStage:
+    """Synchronous stage whose moves only end when stopped"""
+
+    def __init__(self):
+        self.stopped = threading.Event()
+
+    def move_absolute(self, value):
+        self.stopped.wait(5)
+
+    def stop(self):
+        self.stopped.set()
+
+
+class CONEXController:
+    """Responder for a mock transport, moving at one unit per `speed` s"""
+
+    def __init__(self, speed=1.0):
+        self.speed = speed
+        self.position = 0.0
+        self.target = 0.0
+        self.t0 = 0.0
+        self.commands = []
+
+    def current(self):
+        travel = (time.monotonic() - self.t0) / self.speed
+        if travel >= abs(self.target - self.position):
+            return self.target
+        return self.position + travel * (1 if self.target > self.position else -1)
+
+    def __call__(self, data):
+        command = data.decode().strip()[1:]
+        self.commands.append(command)
+        if command == "MM?":
+            moving = self.current() != self.target
+            return b"1MM28\r\n" if moving else b"1MM33\r\n"
+        if command == "TP":
+            return f"1TP{self.current()}\r\n".encode()
+        if command.startswith("PA"):
+            self.position, self.target = self.current(), float(command[2:])
+            self.t0 = time.monotonic()
+        elif command == "ST":
+            self.position = self.target = self.current()
+        return data
+
+
+def make_conex(speed=1.0):
+    controller = CONEXController(speed)
+    device = CONEXDevice(serial_kwargs={"transport": "mock"}, delay=0.01)
+    device.serial.responder = controller
+    return AsyncCONEXDevice(device, poll=0.001), controller
+
+
+@pytest.mark.parametrize("cancel", [False, True])
+def test_interrupted_move_is_stopped(cancel):
+    stage = BlockingStage()
+    device = AsyncMotionDevice(stage)
+
+    async def main():
+        if not cancel:
+            await device.move_absolute(1, timeout=0.05)
+        task = asyncio.ensure_future(device.move_absolute(1))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await task
+
+    error = asyncio.CancelledError if cancel else asyncio.TimeoutError
+    with pytest.raises(error):
+        asyncio.run(main())
+    assert stage.stopped.is_set()
+
+
+def test_conex_move():
+    device, controller = make_conex(speed=0.01)
+    position = asyncio.run(device.move_absolute(2, timeout=1))
+    assert position == 2
+    assert "PA2" in controller.commands
+    assert controller.commands[-2] == "MM?"
+
+
+@pytest.mark.parametrize("cancel", [False, True])
+def test_conex_interrupted_move_is_stopped(cancel):
+    device, controller = make_conex(speed=1.0)
+
+    async def main():
+        if not cancel:
+            return await device.move_absolute(10, timeout=0.05)
+        task = asyncio.ensure_future(device.move_absolute(10))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        return await task
+
+    error = asyncio.CancelledError if cancel else asyncio.TimeoutError
+    with pytest.raises(error):
+        asyncio.run(main())
+    assert controller.commands[-2:] == ["ST", "TP"]
+    assert controller.target < 1
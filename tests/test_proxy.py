@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+from serial import SerialException
+
+from device_control.daemons.proxy import DeviceProxy, DeviceUnavailableError
+
+
+class FakeStage:
+    def __init__(self):
+        self.error = None
+
+    def get_position(self):
+        if self.error is not None:
+            raise self.error
+        return 1.5
+
+
+def make(stage):
+    return DeviceProxy("stage", lambda: stage, "STAGE", min_backoff=60)
+
+
+def test_query_returns_value():
+    proxy = make(FakeStage())
+    result = proxy.query("get_position")
+    assert result["value"] == 1.5
+    assert result["stale"] is False
+
+
+def test_timeout_keeps_device_connected():
+    stage = FakeStage()
+    proxy = make(stage)
+    proxy.query("get_position")
+    stage.error = TimeoutError("move did not complete")
+    with pytest.raises(TimeoutError):
+        proxy.query("get_position")
+    assert proxy.is_connected()
+    assert not proxy.is_reconnecting()
+
+
+def test_link_loss_serves_cache():
+    stage = FakeStage()
+    proxy = make(stage)
+    proxy.query("get_position")
+    stage.error = SerialException("device disconnected")
+    result = proxy.query("get_position")
+    assert result == {"value": 1.5, "stale": True, "t": result["t"]}
+    assert not proxy.is_connected()
+    # no more connection attempts until the reconnect thread gets to it
+    with pytest.raises(DeviceUnavailableError):
+        proxy.query("get_status")
+
+
+def test_hung_connect_is_abandoned():
+    release = threading.Event()
+    stage = FakeStage()
+
+    def connect():
+        release.wait()
+        return stage
+
+    proxy = DeviceProxy("stage", connect, "STAGE", min_backoff=60, connect_timeout=0.05)
+    with pytest.raises(DeviceUnavailableError):
+        proxy.connect()
+    # the lock was released, so the next attempt is not refused as "still connecting"
+    with pytest.raises(DeviceUnavailableError, match="did not connect"):
+        proxy.connect()
+    release.set()
+    time.sleep(0.05)
+    assert proxy.connect() is stage
+
+
+def test_link_loss_disconnects_driver():
+    stage = FakeStage()
+    stage.disconnect = lambda: setattr(stage, "disconnected", True)
+    proxy = make(stage)
+    proxy.query("get_position")
+    stage.error = SerialException("device disconnected")
+    proxy.query("get_position")
+    assert stage.disconnected
@@ -0,0 +1,35 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from device_control import pyro_client
+
+
+class FakeProxy:
+    def __init__(self, uri):
+        self.uri = uri
+        self.released = False
+
+    def _pyroRelease(self):
+        self.released = True
+
+
+def test_forget_drops_every_threads_proxy(monkeypatch):
+    lookups = []
+
+    def connect(pyro_key):
+        lookups.append(pyro_key)
+        return FakeProxy(f"{pyro_key}@{len(lookups)}")
+
+    monkeypatch.setattr(pyro_client, "connect", connect)
+    key = f"test-{threading.get_ident()}"
+    with ThreadPoolExecutor(max_workers=1) as worker:
+        old = worker.submit(pyro_client.get_proxy, key).result()
+        assert pyro_client.get_proxy(key).uri == old.uri
+        assert worker.submit(pyro_client.get_proxy, key).result() is old
+        # e.g. the main thread saw the daemon restart
+        pyro_client.forget(key)
+        new = worker.submit(pyro_client.get_proxy, key).result()
+    assert new.uri != old.uri
+    assert old.released
+    assert pyro_client.get_proxy(key).uri == new.uri
+    assert len(lookups) == 2
@@ -0,0 +1,50 @@
+import threading
+import time
+
+from device_control.scheduler import Priority, io_priority
+from device_control.singleflight import single_flight
+
+
+class SlowStage:
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+
+    @single_flight
+    def get_position(self):
+        self.calls += 1
+        call = self.calls
+        time.sleep(self.delay)
+        return call
+
+
+def call_in_thread(func, priority):
+    results = []
+
+    def run():
+        with io_priority(priority):
+            results.append(func())
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, results
+
+
+def test_concurrent_calls_are_shared():
+    stage = SlowStage(delay=0.1)
+    thread, results = call_in_thread(stage.get_position, Priority.STATUS)
+    time.sleep(0.02)
+    assert stage.get_position() == 1
+    thread.join()
+    assert results == [1]
+    assert stage.calls == 1
+
+
+def test_urgent_call_does_not_join_poll():
+    stage = SlowStage(delay=0.1)
+    thread, results = call_in_thread(stage.get_position, Priority.POLL)
+    time.sleep(0.02)
+    with io_priority(Priority.MOVE):
+        assert stage.get_position() == 2
+    thread.join()
+    assert results == [1]
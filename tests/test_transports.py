@@ -0,0 +1,74 @@
+import socket
+import threading
+
+import pytest
+
+from device_control.facility.simulator import WPU_PORT, FacilitySimulator
+from device_control.interfaces import (
+    MockTransport,
+    SerialTransport,
+    SSHChannelTransport,
+    TCPTransport,
+    transport_from_kwargs,
+)
+from device_control.ssh_pool import get_connection
+
+
+def test_serial():
+    transport = transport_from_kwargs({"port": None, "baudrate": 115200, "timeout": 0.1})
+    assert isinstance(transport, SerialTransport)
+    assert transport.timeout == 0.1
+    with pytest.raises(ValueError, match="device_number"):
+        transport_from_kwargs({"port": None, "device_number": 1})
+
+
+def test_mock():
+    transport = transport_from_kwargs(
+        {"transport": "mock", "port": "/dev/ttyUSB0", "baudrate": 9600, "timeout": 0.1}
+    )
+    assert isinstance(transport, MockTransport)
+    assert transport.name == "/dev/ttyUSB0"
+    with pytest.raises(ValueError, match="host"):
+        transport_from_kwargs({"transport": "mock", "host": "moxa"})
+
+
+def test_tcp():
+    server = socket.create_server(("127.0.0.1", 0))
+    port = server.getsockname()[1]
+
+    def serve():
+        conn, _ = server.accept()
+        with conn:
+            conn.sendall(b"ok " + conn.recv(100))
+
+    threading.Thread(target=serve, daemon=True).start()
+    transport = transport_from_kwargs(
+        {"transport": "tcp", "host": "127.0.0.1", "port": port, "baudrate": 9600, "timeout": 1}
+    )
+    assert isinstance(transport, TCPTransport)
+    with transport:
+        transport.write(b"hello\n")
+        assert transport.readline() == b"ok hello\n"
+    server.close()
+    with pytest.raises(ValueError, match="user"):
+        transport_from_kwargs({"transport": "tcp", "host": "moxa", "port": 4001, "user": "me"})
+
+
+def test_ssh():
+    with FacilitySimulator() as sim:
+        # the shared connection keeps the first caller's credentials
+        get_connection(sim.host, user="transports", **sim.connect_kwargs)
+        transport = transport_from_kwargs(
+            {"transport": "ssh", "host": sim.host, "port": WPU_PORT, "user": "transports"}
+        )
+        assert isinstance(transport, SSHChannelTransport)
+        with transport:
+            transport.write(b"hwp status\n")
+            assert transport.readline().startswith(b"hwp position")
+    with pytest.raises(ValueError, match="password"):
+        transport_from_kwargs({"transport": "ssh", "host": "scexao", "password": "x"})
+
+
+def test_unknown_kind():
+    with pytest.raises(ValueError, match="Unknown transport"):
+        transport_from_kwargs({"transport": "carrier pigeon"})
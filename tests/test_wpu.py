@@ -0,0 +1,75 @@
+import threading
+import time
+
+from device_control.facility.wpu import WPU_SHW
+
+
+class FakeChannel:
+    """WPU server channel, replying to moves and status requests after the given delays"""
+
+    def __init__(self, move_delay, status_delay=0):
+        self.move_delay = move_delay
+        self.status_delay = status_delay
+        self.timeout = None
+        self.closed = False
+        self.eof_received = False
+        self._data = b""
+        self._cond = threading.Condition()
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def _deliver(self, data, delay):
+        def deliver():
+            time.sleep(delay)
+            with self._cond:
+                self._data += data
+                self._cond.notify_all()
+
+        threading.Thread(target=deliver, daemon=True).start()
+
+    def sendall(self, data):
+        command = data.decode().strip()
+        if command.endswith("status"):
+            self._deliver(b"position 12.5 target 12.5 mode IDLE\n", self.status_delay)
+        else:
+            self._deliver(b"OK moving\n", self.move_delay)
+
+    def recv_ready(self):
+        return len(self._data) > 0
+
+    def recv(self, size):
+        with self._cond:
+            if not self._cond.wait_for(lambda: len(self._data) > 0, self.timeout):
+                raise TimeoutError
+            data, self._data = self._data[:size], self._data[size:]
+            return data
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self, channel):
+        self.channel = channel
+
+    def open_channel(self, *args, **kwargs):
+        return self.channel
+
+
+def test_late_reply_is_not_taken_for_status():
+    # the move's reply arrives while the status is on its way
+    channel = FakeChannel(move_delay=0.05, status_delay=0.1)
+    stage = WPU_SHW(connection=FakeConnection(channel), publish=False)
+    stage.move_absolute(12.5)
+    status = stage.get_status()
+    assert status == {"position": 12.5, "target": 12.5, "mode": "IDLE"}
+
+
+def test_missing_reply_times_out():
+    channel = FakeChannel(move_delay=10)
+    stage = WPU_SHW(connection=FakeConnection(channel), publish=False)
+    stage.ACK_TIMEOUT = 0.05
+    t0 = time.monotonic()
+    stage.move_absolute(12.5)
+    assert time.monotonic() - t0 < 1